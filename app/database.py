@@ -1,35 +1,147 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import threading
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import StaticPool
 
 Base = declarative_base()
 SessionLocal = None
 engine = None
 
-def init_db(db_user, db_password, db_host, db_name, db_port=3306, driver="mysql+pymysql"):
-    import logging
+# Rows per multi-row INSERT when a bulk insert is executed as executemany
+INSERT_PAGE_SIZE = 1000
+
+# Identifies the request currently being served; set by the app's session middleware
+_request_scope = ContextVar("request_scope", default=None)
+
+
+def _session_scope():
+    """
+    Scope function for the scoped session registry.
+    Sessions are shared within one request (across the threadpool workers
+    FastAPI uses for sync dependencies and routes), otherwise per thread.
+    """
+    scope = _request_scope.get()
+    return scope if scope is not None else threading.get_ident()
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling with NORMAL sync on every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # ignored by in-memory databases
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def init_db(
+    db_user,
+    db_password,
+    db_host,
+    db_name,
+    db_port=3306,
+    driver="mysql+pymysql",
+    pool_size=20,
+    max_overflow=30,
+    pool_timeout=5,
+    pool_recycle=3600,
+):
+    """
+    Create the SQLAlchemy engine and session factory.
+    Any engine created by a previous call is disposed first.
+
+    Args:
+        db_user (str): database username
+        db_password (str): database password
+        db_host (str): database host
+        db_name (str): database name (or file path / ":memory:" for sqlite)
+        db_port (int): database port
+        driver (str): SQLAlchemy driver name, e.g. "mysql+pymysql" or "sqlite"
+        pool_size (int): number of connections kept open in the pool
+        max_overflow (int): extra connections allowed above pool_size under load
+        pool_timeout (int): seconds to wait for a free connection before failing
+        pool_recycle (int): seconds after which a connection is replaced
+
+    Returns:
+        Engine: the created SQLAlchemy engine
+    """
     global engine, SessionLocal
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+    # Re-initializing must not leak the previous engine's pooled connections
+    if engine is not None:
+        engine.dispose()
+
     if driver.startswith("sqlite"):
         DATABASE_URL = f"sqlite:///{db_name}"  # db_name can be ":memory:"
+        # A single shared connection keeps in-memory databases alive across sessions;
+        # file databases keep the default pool so each session gets its own connection
+        pool_options = {"poolclass": StaticPool} if db_name in ("", ":memory:") else {}
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            insertmanyvalues_page_size=INSERT_PAGE_SIZE,
+            **pool_options,
+            echo=False,
+            future=True,
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
     else:
         DATABASE_URL = f"{driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+        # utf8mb4 end to end avoids per-row charset conversion in the driver
+        connect_args = {"charset": "utf8mb4"} if driver.startswith("mysql") else {}
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args=connect_args,
+            # Reads don't need InnoDB's REPEATABLE READ snapshots and gap locks
+            isolation_level="READ COMMITTED",
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True,
+            insertmanyvalues_page_size=INSERT_PAGE_SIZE,
+            echo=False,
+            future=True,
+        )
 
-    engine = create_engine(DATABASE_URL, echo=False, future=True)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    SessionLocal = scoped_session(
+        sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        scopefunc=_session_scope,
+    )
     return engine
 
 
 def get_db():
     """
     Dependency for FastAPI routes.
-    Yields a database session and ensures it's closed after use.
+    Returns the session bound to the current request scope; the session
+    middleware removes it once the response has been produced.
     """
     if SessionLocal is None:
         raise RuntimeError("SessionLocal is not initialized. Call init_db() first.")
 
-    db = SessionLocal()
+    return SessionLocal()
+
+
+def open_request_scope():
+    """
+    Start a new session scope for an incoming request.
+
+    Returns:
+        Token: token to pass to close_request_scope()
+    """
+    return _request_scope.set(object())
+
+
+def close_request_scope(token):
+    """
+    Close and discard the session of the current request scope, then restore the previous scope.
+
+    Args:
+        token (Token): token returned by open_request_scope()
+    """
     try:
-        yield db
+        if SessionLocal is not None:
+            SessionLocal.remove()
     finally:
-        db.close()
+        _request_scope.reset(token)
@@ -1,3 +1,14 @@
+import logging
+import sys
+from sqlalchemy.exc import (
+    OperationalError,
+    ProgrammingError,
+    IntegrityError,
+    NoSuchModuleError,
+    SQLAlchemyError
+)
+
+
 def handle_db_exception(e, context="database operation", exit_on_error=True):
     """
     Handle common SQLAlchemy / DB exceptions with friendly logging.
@@ -7,16 +18,6 @@ def handle_db_exception(e, context="database operation", exit_on_error=True):
         context (str): description of what was being attempted
         exit_on_error (bool): whether to sys.exit(1) on error (for CLI scripts)
     """
-    import logging
-    import sys
-    from sqlalchemy.exc import (
-        OperationalError,
-        ProgrammingError,
-        IntegrityError,
-        NoSuchModuleError,
-        SQLAlchemyError
-    )
-
     re_raise = True  # whether to propagate the exception
 
     if isinstance(e, OperationalError):
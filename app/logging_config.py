@@ -1,11 +1,22 @@
+import atexit
 import logging
 import os
+import queue
+import threading
 from colorama import init as colorama_init
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, MemoryHandler, QueueHandler, QueueListener
 
 # initialize colorama for Windows
 colorama_init(autoreset=True)
 
+BUFFER_CAPACITY = 1024  # records buffered in memory before they are written to a log file
+FLUSH_INTERVAL = 5      # seconds between periodic flushes of buffered records
+
+_buffered_handlers = []  # MemoryHandlers wrapping the log files
+_flush_thread = None
+_flush_stop = None  # Event that ends the current _flush_thread
+_listeners = []  # (logger, QueueHandler, QueueListener) attached by setup_logging
+
 class ColorFormatter(logging.Formatter):
     COLORS = {
         logging.DEBUG: "\033[37m",   # gray
@@ -21,6 +32,77 @@ class ColorFormatter(logging.Formatter):
         message = super().format(record)
         return f"{color}{message}{self.RESET}"
 
+def flush_logs():
+    """Write all buffered records to their log files."""
+    for handler in list(_buffered_handlers):
+        handler.flush()
+
+def _periodic_flush(stop):
+    while not stop.wait(FLUSH_INTERVAL):
+        flush_logs()
+
+def _stop_flush_thread():
+    """Stop the periodic flush thread, so a later setup_logging() can start a new one."""
+    global _flush_thread, _flush_stop
+    if _flush_thread is not None:
+        _flush_stop.set()
+        _flush_thread.join()
+    _flush_thread = _flush_stop = None
+
+def _buffered(file_handler):
+    """
+    Wrap a file handler so records are written in batches.
+    The buffer is flushed when full, on ERROR records, every FLUSH_INTERVAL
+    seconds and at interpreter exit.
+    """
+    global _flush_thread, _flush_stop
+    handler = MemoryHandler(capacity=BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler)
+    _buffered_handlers.append(handler)
+    if _flush_thread is None:
+        _flush_stop = threading.Event()
+        _flush_thread = threading.Thread(target=_periodic_flush, args=(_flush_stop,), name="log-flush", daemon=True)
+        _flush_thread.start()
+    return handler
+
+def _close(handler):
+    """Flush and close a handler (and the file behind it when buffered)."""
+    handler.close()
+    if isinstance(handler, MemoryHandler):
+        if handler in _buffered_handlers:
+            _buffered_handlers.remove(handler)
+        if handler.target is not None:
+            handler.target.close()
+
+def _attach(logger, *handlers):
+    """
+    Route a logger's records through a queue to a background listener thread,
+    so the given handlers' I/O happens off the calling thread. QueueHandler.prepare()
+    still formats each record on the calling thread before it is queued.
+    """
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    _listeners.append((logger, queue_handler, listener))
+
+def stop_logging():
+    """
+    Stop the listener and flush threads started by setup_logging.
+    Pending records are written out and the handlers closed.
+    """
+    # Stop periodic flushing first so it never touches a handler closed below
+    _stop_flush_thread()
+    while _listeners:
+        logger, queue_handler, listener = _listeners.pop()
+        logger.removeHandler(queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            _close(handler)
+
+atexit.register(stop_logging)
+
 def setup_logging(
     log_to_terminal=True,
     log_to_file=True,
@@ -30,6 +112,11 @@ def setup_logging(
     """
     Central logging configuration.
 
+    Records are handed to a QueueListener thread that owns the real handlers,
+    and file handlers are buffered in memory (see BUFFER_CAPACITY / FLUSH_INTERVAL),
+    so request paths neither format records nor wait on disk writes.
+    Call stop_logging() on shutdown to drain the queues.
+
     Args:
         log_to_terminal (bool): enable colored logs in terminal
         log_to_file (bool): enable saving logs to files
@@ -37,18 +124,20 @@ def setup_logging(
         log_dir (str): directory for log files
     """
     os.makedirs(log_dir, exist_ok=True)
-    
+    stop_logging()
+
     # ------------------ App root logger ------------------
     root = logging.getLogger()
     root.setLevel(level)
     root.handlers.clear()
 
     formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    handlers = []
 
     if log_to_terminal:
         terminal_handler = logging.StreamHandler()
         terminal_handler.setFormatter(ColorFormatter("%(asctime)s [%(levelname)s] %(message)s"))
-        root.addHandler(terminal_handler)
+        handlers.append(terminal_handler)
 
     if log_to_file:
         app_file_handler = RotatingFileHandler(
@@ -57,7 +146,10 @@ def setup_logging(
             backupCount=5
         )
         app_file_handler.setFormatter(formatter)
-        root.addHandler(app_file_handler)
+        handlers.append(_buffered(app_file_handler))
+
+    if handlers:
+        _attach(root, *handlers)
 
     # ------------------ Uvicorn logging ------------------
     if log_to_file:
@@ -69,10 +161,7 @@ def setup_logging(
             backupCount=5
         )
         uvicorn_file_handler.setFormatter(formatter)
-        # Avoid duplicating handlers
-        if not any(isinstance(h, RotatingFileHandler) and "uvicorn.log" in h.baseFilename 
-                   for h in uvicorn_logger.handlers):
-            uvicorn_logger.addHandler(uvicorn_file_handler)
+        _attach(uvicorn_logger, _buffered(uvicorn_file_handler))
 
         # Optional: disable Uvicorn's default console logs if desired
         # uvicorn_logger.propagate = False
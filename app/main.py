@@ -3,29 +3,45 @@ Main FastAPI application entry point for the SWAPI CRUD API.
 
 Responsibilities:
 - Load database configuration from .ini file or environment variables
-- Initialize database connection
+- Initialize database connection on startup (lifespan) and dispose it on shutdown
+- Size the worker threadpool that runs sync routes to the connection pool
 - Create FastAPI app with routes and exception handlers
 - Configure logging
 """
 
 import os
+import anyio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
-from app.database import init_db
+from app import database
+from app.database import init_db, open_request_scope, close_request_scope
 from app.routes import swapi_routes
-from app.logging_config import setup_logging, logging
+from app.logging_config import setup_logging, stop_logging, logging
 from scripts.load_utils import load_config_ini
 from app.db_exceptions import handle_db_exception
+from app.services.swapi_service import SwapiFetchError
 
+# Connection pool settings read from the environment: config key -> (init_db option, default)
+POOL_SETTINGS = {
+    "DB_POOL_SIZE": ("pool_size", 20),
+    "DB_MAX_OVERFLOW": ("max_overflow", 30),
+    "DB_POOL_TIMEOUT": ("pool_timeout", 5),
+    "DB_POOL_RECYCLE": ("pool_recycle", 3600),
+}
 
 # -------------------- Configuration Loader --------------------
 def load_configuration() -> dict:
     """
     Load database configuration from a .ini file or fallback to environment variables.
 
+    Connection pool settings (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE) are always read from environment variables.
+
     Returns:
         dict: dictionary with keys 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_NAME', 'DB_PORT'
+              and the connection pool settings
 
     Raises:
         RuntimeError: if required DB configuration variables are missing
@@ -54,6 +70,10 @@ def load_configuration() -> dict:
             "DB_PORT": int(os.getenv("DB_PORT", 3306)),
         }
 
+    # Connection pool tuning
+    for key, (_, default) in POOL_SETTINGS.items():
+        config[key] = int(os.getenv(key, default))
+
     # Validate required variables
     if not all([config["DB_USER"], config["DB_PASSWORD"], config["DB_NAME"]]):
         raise RuntimeError("Missing required database configuration (user/password/db_name)")
@@ -69,36 +89,74 @@ def initialize_database(config: dict):
     Args:
         config (dict): database configuration dictionary with keys:
                        DB_USER, DB_PASSWORD, DB_HOST, DB_NAME, DB_PORT
+                       and optionally the connection pool settings
 
     Raises:
         Exception: propagates any exception raised by init_db
     """
+    pool_options = {
+        option: config[key] for key, (option, _) in POOL_SETTINGS.items() if key in config
+    }
     try:
-        init_db(
+        engine = init_db(
             config["DB_USER"],
             config["DB_PASSWORD"],
             config["DB_HOST"],
             config["DB_NAME"],
             config["DB_PORT"],
+            **pool_options,
         )
-        logging.info("Database connection initialized successfully")
+        logging.info(f"Database connection initialized successfully ({engine.pool.status()})")
     except Exception as e:
         handle_db_exception(e, context="initializing database", exit_on_error=False)
 
 
+def worker_thread_limit(config: dict) -> int:
+    """
+    Number of threads available to sync routes: one per connection the pool can open.
+
+    Args:
+        config (dict): database configuration, optionally with the connection pool settings
+
+    Returns:
+        int: pool_size + max_overflow
+    """
+    return sum(
+        config.get(key, POOL_SETTINGS[key][1]) for key in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW")
+    )
+
+
 # -------------------- FastAPI App Factory --------------------
 def create_app(config: dict = None) -> FastAPI:
     """
     Factory to create FastAPI app with logging, routes, and exception handlers.
 
+    Logging and the database are initialized in the app lifespan, so every worker
+    process starts its own log threads and connection pool after startup and
+    stops them on shutdown.
+
     Args:
-        config (dict, optional): database configuration. If provided, DB will be initialized.
+        config (dict, optional): database configuration. If not provided, it is
+                                 loaded with load_configuration() on startup.
 
     Returns:
         FastAPI: configured FastAPI application instance
     """
-    # Setup logging
-    setup_logging(log_to_terminal=True, log_to_file=True)
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Start logging, the database and threadpool on startup; release the connection pool and drain logs on shutdown"""
+        # Logging threads start here, not at import, so every (pre-forked) worker
+        # process gets its own listener threads, and each startup pairs with stop_logging()
+        setup_logging(log_to_terminal=True, log_to_file=True)
+        app_config = config if config else load_configuration()
+        initialize_database(app_config)
+        # Sync routes run in anyio's threadpool (40 threads by default); let every
+        # pooled connection be in use at once instead of queueing on the limiter
+        anyio.to_thread.current_default_thread_limiter().total_tokens = worker_thread_limit(app_config)
+        yield
+        if database.engine is not None:
+            database.engine.dispose()
+        stop_logging()
 
     app = FastAPI(
         title="SWAPI CRUD API",
@@ -113,19 +171,36 @@ def create_app(config: dict = None) -> FastAPI:
         version="1.0.0",
         contact={"name": "vamartid", "email": "vamartid@gmail.com"},
         license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
+        lifespan=lifespan,
     )
     app.include_router(swapi_routes.router)
 
+    # Database session lifecycle
+    @app.middleware("http")
+    async def db_session_middleware(request: Request, call_next):
+        """Scope one database session per request and remove it after the response"""
+        token = open_request_scope()
+        try:
+            return await call_next(request)
+        finally:
+            close_request_scope(token)
+
     # Exception handlers
     @app.exception_handler(SQLAlchemyError)
     async def db_exception_handler(request: Request, exc: SQLAlchemyError):
         """Handle SQLAlchemy database errors"""
-        logging.error(f"Database error: {exc}")
+        logging.error(f"Database error in {request.method} {request.url.path}: {exc}")
         return JSONResponse(
             status_code=500,
             content={"detail": "Database error occurred. Please check logs."},
         )
 
+    @app.exception_handler(SwapiFetchError)
+    async def swapi_exception_handler(request: Request, exc: SwapiFetchError):
+        """Handle upstream SWAPI failures as 502 Bad Gateway"""
+        logging.error(f"SWAPI error in {request.method} {request.url.path}: {exc}")
+        return JSONResponse(status_code=502, content={"detail": str(exc)})
+
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
         """Handle FastAPI HTTP exceptions"""
@@ -135,16 +210,11 @@ def create_app(config: dict = None) -> FastAPI:
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
         """Handle all other unhandled exceptions"""
-        logging.error(f"Unhandled error: {exc}")
+        logging.error(f"Unhandled error in {request.method} {request.url.path}: {exc}")
         return JSONResponse(status_code=500, content={"detail": "Internal server error. Check logs."})
 
-    # Optionally initialize DB (only if config provided)
-    if config:
-        initialize_database(config)
-
     return app
 
 
 # -------------------- App instance --------------------
-config = load_configuration()
-app = create_app(config)
+app = create_app()
@@ -1,34 +1,72 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Table, ForeignKey, Index, DDL, event, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 # Association tables
+# (parent_id, child_id) is the clustered primary key, so lookups by the leading
+# column are index seeks; the reverse index serves lookups from the other side.
 character_film = Table(
     "character_film",
     Base.metadata,
-    Column("character_id", Integer, ForeignKey("character.id")),
-    Column("film_id", Integer, ForeignKey("film.id")),
+    Column("character_id", Integer, ForeignKey("character.id"), primary_key=True),
+    Column("film_id", Integer, ForeignKey("film.id"), primary_key=True),
+    Index("ix_character_film_film_id", "film_id"),
 )
 
 character_starship = Table(
     "character_starship",
     Base.metadata,
-    Column("character_id", Integer, ForeignKey("character.id")),
-    Column("starship_id", Integer, ForeignKey("starship.id")),
+    Column("character_id", Integer, ForeignKey("character.id"), primary_key=True),
+    Column("starship_id", Integer, ForeignKey("starship.id"), primary_key=True),
+    Index("ix_character_starship_starship_id", "starship_id"),
 )
 
 film_starship = Table(
     "film_starship",
     Base.metadata,
-    Column("film_id", Integer, ForeignKey("film.id")),
-    Column("starship_id", Integer, ForeignKey("starship.id")),
+    Column("film_id", Integer, ForeignKey("film.id"), primary_key=True),
+    Column("starship_id", Integer, ForeignKey("starship.id"), primary_key=True),
+    Index("ix_film_starship_starship_id", "starship_id"),
 )
 
+# The trigram indexes need pg_trgm's gin_trgm_ops; create the extension with the schema
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+def trigram_index(table_name, column):
+    """
+    GIN trigram index so `%term%` searches on PostgreSQL avoid full scans
+    (uses the pg_trgm extension, created before the tables). It is skipped on
+    other dialects, where `%term%` searches scan the table.
+    """
+    return Index(
+        f"ix_{table_name}_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+def pattern_index(table_name, column):
+    """
+    btree index with varchar_pattern_ops so `prefix%` LIKE searches on PostgreSQL
+    use an index regardless of the database collation; the plain unique index only
+    serves them under the C collation. MySQL's unique index serves them already.
+    """
+    return Index(
+        f"ix_{table_name}_{column}_pattern",
+        column,
+        postgresql_ops={column: "varchar_pattern_ops"},
+    ).ddl_if(dialect="postgresql")
+
 # Models
 class Character(Base):
     __tablename__ = "character"
+    __table_args__ = (trigram_index("character", "name"), pattern_index("character", "name"))
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), unique=True, nullable=False)
+    name = Column(String(100), unique=True, index=True, nullable=False)
     gender = Column(String(20))
     birth_year = Column(String(20))
     films = relationship("Film", secondary=character_film, back_populates="characters")
@@ -37,19 +75,29 @@ class Character(Base):
 
 class Film(Base):
     __tablename__ = "film"
+    __table_args__ = (trigram_index("film", "title"), pattern_index("film", "title"))
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(200), unique=True, nullable=False)
+    title = Column(String(200), unique=True, index=True, nullable=False)
     director = Column(String(100))
-    release_date = Column(String(20))
+    release_date = Column(Date)
     characters = relationship("Character", secondary=character_film, back_populates="films")
     starships = relationship("Starship", secondary=film_starship, back_populates="films")
 
 
 class Starship(Base):
     __tablename__ = "starship"
+    __table_args__ = (trigram_index("starship", "name"), pattern_index("starship", "name"))
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), unique=True, nullable=False)
+    name = Column(String(100), unique=True, index=True, nullable=False)
     model = Column(String(100))
     manufacturer = Column(String(100))
     characters = relationship("Character", secondary=character_starship, back_populates="starships")
     films = relationship("Film", secondary=film_starship, back_populates="starships")
+
+# Functional indexes for the case-insensitive exact-match comparisons of the search
+# endpoints, PostgreSQL only: MySQL < 8.0.13 and MariaDB reject functional index
+# syntax, and MySQL's default _ci collation already compares case-insensitively
+# through the unique index on the column
+Index("ix_character_name_lower", func.lower(Character.name)).ddl_if(dialect="postgresql")
+Index("ix_film_title_lower", func.lower(Film.title)).ddl_if(dialect="postgresql")
+Index("ix_starship_name_lower", func.lower(Starship.name)).ddl_if(dialect="postgresql")
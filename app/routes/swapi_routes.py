@@ -1,57 +1,256 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from functools import wraps
+import threading
+import time
 from app.database import get_db
-from app.models import Character, Film, Starship
+from app.models import (
+    Character, Film, Starship,
+    character_film, character_starship, film_starship,
+)
+from app.schemas import CharacterOut, FilmOut, StarshipOut
 import app.services.swapi_service as swapi
 from app.services.swapi_sync import sync_all
 import logging
-from app.db_exceptions import handle_db_exception
 
-LOG_FETCHED_OBJECTS = True  # Set to False to disable logging
+logger = logging.getLogger(__name__)
 
-# -------------------- Decorator --------------------
-def safe_route(func):
+MAX_SKIP = 10000  # Largest accepted `skip` value
+CHILD_ROWS_BATCH = 500  # Related rows fetched per round trip when grouping relationships
+CACHE_TTL_SECONDS = 300  # How long GET results are cached in-process; 0 disables caching
+CACHE_MAX_ENTRIES = 1024  # Oldest entries are evicted beyond this size
+
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+_cache_generation = 0  # Bumped by clear_response_cache(); results computed before a bump aren't stored
+
+# -------------------- Caching --------------------
+def cached_route(func):
     """
-    Decorator for route functions to add:
-    - try/except error handling
-    - logging for errors and empty results
-    - input validation for skip/limit parameters
+    Decorator for read-only route functions to cache their results in-process.
+
+    Results are keyed on the route name and its query parameters (the db session
+    is ignored) and expire after CACHE_TTL_SECONDS. The sync routes call
+    clear_response_cache() since they are the only way the data changes; a result
+    computed while a sync cleared the cache is returned but not stored.
+
+    The cache is per process: a sync handled by one worker does not clear the
+    caches of other workers, which keep serving their entries until they expire.
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        try:
-            # Validate skip/limit if present
-            if "skip" in kwargs and kwargs["skip"] > 10000:
-                raise HTTPException(status_code=400, detail="Skip value too large")
-            if "limit" in kwargs and ("limit" in kwargs) and (kwargs["limit"] < 1 or kwargs["limit"] > 100):
-                raise HTTPException(status_code=400, detail="Limit must be 1–100")
-
-            result = func(*args, **kwargs)
-
-            if isinstance(result, list) and not result:
-                logging.info(f"{func.__name__}: no data found")
-
-            return result
-
-        except HTTPException:
-            raise  # propagate proper FastAPI exceptions
-        except Exception as e:
-            logging.error(f"Error in {func.__name__}: {e}")
-            try:
-                handle_db_exception(e, exit_on_error=False)
-            except Exception:
-                pass
-            raise HTTPException(status_code=500, detail=f"Internal error in {func.__name__}")
+        if CACHE_TTL_SECONDS <= 0:
+            return func(*args, **kwargs)
+
+        key = (func.__name__, tuple(sorted((k, v) for k, v in kwargs.items() if k != "db")))
+        now = time.monotonic()
+        with _response_cache_lock:
+            entry = _response_cache.get(key)
+            generation = _cache_generation
+        if entry and entry[0] > now:
+            return entry[1]
+
+        result = func(*args, **kwargs)
+        with _response_cache_lock:
+            if generation != _cache_generation:
+                # A sync cleared the cache meanwhile; this result may predate it
+                return result
+            if key not in _response_cache and len(_response_cache) >= CACHE_MAX_ENTRIES:
+                _response_cache.pop(next(iter(_response_cache)))
+            _response_cache[key] = (now + CACHE_TTL_SECONDS, result)
+        return result
 
     return wrapper
 
+def clear_response_cache():
+    """Drop all cached GET results, e.g. after new SWAPI data has been synced."""
+    global _cache_generation
+    with _response_cache_lock:
+        _cache_generation += 1
+        _response_cache.clear()
+
+# -------------------- Query helpers --------------------
+# Columns returned for each resource
+RESOURCE_COLUMNS = {
+    Character: ("id", "name", "gender", "birth_year"),
+    Film: ("id", "title", "director", "release_date"),
+    Starship: ("id", "name", "model", "manufacturer"),
+}
+
+# Related collections: key -> (association table, parent FK column, child model, child columns)
+RESOURCE_RELATIONS = {
+    Character: {
+        "films": (character_film, "character_id", Film, ("id", "title")),
+        "starships": (character_starship, "character_id", Starship, ("id", "name")),
+    },
+    Film: {
+        "characters": (character_film, "film_id", Character, ("id", "name")),
+        "starships": (film_starship, "film_id", Starship, ("id", "name")),
+    },
+    Starship: {
+        "characters": (character_starship, "starship_id", Character, ("id", "name")),
+        "films": (film_starship, "starship_id", Film, ("id", "title")),
+    },
+}
+
+def bulk_children(db: Session, assoc_table, parent_col, child_model, parent_ids, cols):
+    """
+    Fetch the related rows of many parents with a single query.
+    Rows are streamed in batches of CHILD_ROWS_BATCH rather than fetched all at once.
+
+    Args:
+        db (Session): Database session
+        assoc_table (Table): Association table linking parents and children
+        parent_col (str): Name of the parent FK column in assoc_table
+        child_model: SQLAlchemy model of the related rows
+        parent_ids (list): Ids of the parents
+        cols (tuple): Child columns to return
+
+    Returns:
+        dict[int, list[dict]]: Child rows keyed by parent id
+    """
+    children = {parent_id: [] for parent_id in parent_ids}
+    if not parent_ids:
+        return children
+
+    parent_fk = assoc_table.c[parent_col]
+    child_fk = next(c for c in assoc_table.c if c.references(child_model.__table__.c.id))
+    stmt = (
+        select(parent_fk.label("parent_id"), *(getattr(child_model, c) for c in cols))
+        .select_from(assoc_table.join(child_model, child_fk == child_model.id))
+        .where(parent_fk.in_(parent_ids))
+    )
+    # Stream the rows in batches (server-side cursor where supported) while grouping them
+    for row in db.execute(stmt.execution_options(yield_per=CHILD_ROWS_BATCH)).mappings():
+        children[row["parent_id"]].append({c: row[c] for c in cols})
+    return children
+
+def fetch_resources(db: Session, model, skip: int, limit: int, *criteria, order_by=()):
+    """
+    Fetch a page of resources as plain dicts, including their related collections.
+    Runs one query for the page and one per relationship, without building ORM objects.
+
+    Args:
+        db (Session): Database session
+        model: SQLAlchemy model to query
+        skip (int): Number of records to skip
+        limit (int): Number of records to return
+        *criteria: Optional filter expressions
+        order_by (tuple): Optional ordering expressions, applied before the offset
+
+    Returns:
+        list[dict]: Resources with their related collections
+    """
+    stmt = (
+        select(*(getattr(model, c) for c in RESOURCE_COLUMNS[model]))
+        .where(*criteria)
+        .order_by(*order_by)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    ids = [row["id"] for row in rows]
+    for key, (assoc_table, parent_col, child_model, cols) in RESOURCE_RELATIONS[model].items():
+        children = bulk_children(db, assoc_table, parent_col, child_model, ids, cols)
+        for row in rows:
+            row[key] = children[row["id"]]
+    return rows
+
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so user input is matched literally.
+
+    Args:
+        value (str): Raw search term
+
+    Returns:
+        str: Term with backslash, `%` and `_` escaped by a backslash
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_resources(db: Session, model, column, term: str, skip: int, limit: int):
+    """
+    Search resources by a text column.
+
+    Matches the term anywhere in the column (case-insensitive ILIKE), with exact
+    case-insensitive matches first. The exact matches come from their own equality
+    query, served by the lower(column) index on PostgreSQL and the unique index on
+    MySQL; the substring query then excludes them. Both parts are ordered by id and
+    skip/limit apply to their concatenation, so every page comes from one result set.
+
+    Args:
+        db (Session): Database session
+        model: SQLAlchemy model to query
+        column: Model column to search
+        term (str): Full or partial value to search for
+        skip (int): Number of records to skip
+        limit (int): Number of records to return
+
+    Returns:
+        list[dict]: Matching resources with their related collections
+    """
+    if db.get_bind().dialect.name in ("mysql", "mariadb"):
+        # The default _ci collation already compares case-insensitively
+        exact = column == term
+    else:
+        exact = func.lower(column) == term.lower()
+    # Only a handful of rows can match exactly, so fetching up to skip + limit is cheap
+    exact_rows = fetch_resources(db, model, 0, skip + limit, exact, order_by=(model.id,))
+    page = exact_rows[skip:]
+    if len(page) < limit:
+        pattern = f"%{escape_like(term)}%"
+        page += fetch_resources(
+            db, model, max(skip - len(exact_rows), 0), limit - len(page),
+            column.ilike(pattern, escape="\\"), ~exact,
+            order_by=(model.id,),
+        )
+    return page
+
+def prefix_resources(db: Session, model, column, prefix: str, skip: int, limit: int):
+    """
+    Find resources whose text column starts with a prefix.
+
+    Unlike the `%term%` pattern used by search_resources, a left-anchored LIKE
+    can use a btree index: the unique index on MySQL, the varchar_pattern_ops
+    index on PostgreSQL. Case handling follows the backend's LIKE: case-sensitive
+    on PostgreSQL, case-insensitive on MySQL (_ci collation) and SQLite (ASCII).
+
+    Args:
+        db (Session): Database session
+        model: SQLAlchemy model to query
+        column: Model column to match
+        prefix (str): Leading part of the value
+        skip (int): Number of records to skip
+        limit (int): Number of records to return
+
+    Returns:
+        list[dict]: Matching resources with their related collections
+    """
+    pattern = f"{escape_like(prefix)}%"
+    # A stable order keeps pages from repeating or skipping rows; the prefix index serves it too
+    return fetch_resources(
+        db, model, skip, limit, column.like(pattern, escape="\\"),
+        order_by=(column, model.id),
+    )
+
+def log_fetched(rows, field):
+    """
+    Log the names of fetched resources, or that nothing was found.
+    The message is only built when INFO is enabled for this module's logger.
+
+    Args:
+        rows (list[dict]): Fetched resources
+        field (str): Key holding the display name, e.g. "name" or "title"
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Fetched: %s", " | ".join(row[field] for row in rows) if rows else "no data found")
+
 # -------------------- Router --------------------
 router = APIRouter(prefix="/swapi", tags=["SWAPI"])
 
 # -------------------- Orchestrator --------------------
 @router.post("/sync/all")
-@safe_route
 def sync_all_endpoint(db: Session = Depends(get_db)):
     """
     Sync all SWAPI resources into the database.
@@ -60,11 +259,11 @@ def sync_all_endpoint(db: Session = Depends(get_db)):
     - **Returns**: Message indicating successful sync
     """
     sync_all(db)
+    clear_response_cache()
     return {"message": "All SWAPI data synced successfully"}
 
 # -------------------- Characters --------------------
 @router.post("/sync/characters")
-@safe_route
 def sync_characters(db: Session = Depends(get_db)):
     """
     Fetch characters from SWAPI and store them in the database.
@@ -76,13 +275,15 @@ def sync_characters(db: Session = Depends(get_db)):
     if not characters:
         return {"message": "No characters found to sync"}
     swapi.store_characters(db, characters)
+    db.commit()
+    clear_response_cache()
     return {"message": f"{len(characters)} characters synced successfully"}
 
-@router.get("/characters")
-@safe_route
+@router.get("/characters", response_model=list[CharacterOut])
+@cached_route
 def get_characters(
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -92,24 +293,12 @@ def get_characters(
     - **limit**: Number of records to return (1–100)
     - **Returns**: List of characters with related films and starships
     """
-    chars = db.query(Character).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and chars:
-        logging.info("Fetched: " + " | ".join(c.name for c in chars))
-    return [
-        {
-            "id": c.id,
-            "name": c.name,
-            "gender": c.gender,
-            "birth_year": c.birth_year,
-            "films": [{"id": f.id, "title": f.title} for f in c.films],
-            "starships": [{"id": s.id, "name": s.name} for s in c.starships],
-        }
-        for c in chars
-    ]
+    chars = fetch_resources(db, Character, skip, limit)
+    log_fetched(chars, "name")
+    return chars
 
 # -------------------- Films --------------------
 @router.post("/sync/films")
-@safe_route
 def sync_films(db: Session = Depends(get_db)):
     """
     Fetch films from SWAPI and store them in the database.
@@ -121,13 +310,15 @@ def sync_films(db: Session = Depends(get_db)):
     if not films:
         return {"message": "No films found to sync"}
     swapi.store_films(db, films)
+    db.commit()
+    clear_response_cache()
     return {"message": f"{len(films)} films synced successfully"}
 
-@router.get("/films")
-@safe_route
+@router.get("/films", response_model=list[FilmOut])
+@cached_route
 def get_films(
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -137,24 +328,12 @@ def get_films(
     - **limit**: Number of records to return (1–100)
     - **Returns**: List of films with related characters and starships
     """
-    films = db.query(Film).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and films:
-        logging.info("Fetched: " + " | ".join(f.title for f in films))
-    return [
-        {
-            "id": f.id,
-            "title": f.title,
-            "director": f.director,
-            "release_date": f.release_date,
-            "characters": [{"id": c.id, "name": c.name} for c in f.characters],
-            "starships": [{"id": s.id, "name": s.name} for s in f.starships],
-        }
-        for f in films
-    ]
+    films = fetch_resources(db, Film, skip, limit)
+    log_fetched(films, "title")
+    return films
 
 # -------------------- Starships --------------------
 @router.post("/sync/starships")
-@safe_route
 def sync_starships(db: Session = Depends(get_db)):
     """
     Fetch starships from SWAPI and store them in the database.
@@ -166,13 +345,15 @@ def sync_starships(db: Session = Depends(get_db)):
     if not starships:
         return {"message": "No starships found to sync"}
     swapi.store_starships(db, starships)
+    db.commit()
+    clear_response_cache()
     return {"message": f"{len(starships)} starships synced successfully"}
 
-@router.get("/starships")
-@safe_route
+@router.get("/starships", response_model=list[StarshipOut])
+@cached_route
 def get_starships(
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -182,28 +363,17 @@ def get_starships(
     - **limit**: Number of records to return (1–100)
     - **Returns**: List of starships with related characters and films
     """
-    starships = db.query(Starship).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and starships:
-        logging.info("Fetched: " + " | ".join(s.name for s in starships))
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "model": s.model,
-            "manufacturer": s.manufacturer,
-            "characters": [{"id": c.id, "name": c.name} for c in s.characters],
-            "films": [{"id": f.id, "title": f.title} for f in s.films],
-        }
-        for s in starships
-    ]
+    starships = fetch_resources(db, Starship, skip, limit)
+    log_fetched(starships, "name")
+    return starships
 
 # -------------------- Search --------------------
-@router.get("/characters/search")
-@safe_route
+@router.get("/characters/search", response_model=list[CharacterOut])
+@cached_route
 def search_characters(
     name: str = Query(..., min_length=1, description="Name or partial name to search for"),
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -214,27 +384,16 @@ def search_characters(
     - **limit**: Number of records to return
     - **Returns**: List of matching characters with related films and starships
     """
-    chars = db.query(Character).filter(Character.name.ilike(f"%{name}%")).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and chars:
-        logging.info("Fetched: " + " | ".join(c.name for c in chars))
-    return [
-        {
-            "id": c.id,
-            "name": c.name,
-            "gender": c.gender,
-            "birth_year": c.birth_year,
-            "films": [{"id": f.id, "title": f.title} for f in c.films],
-            "starships": [{"id": s.id, "name": s.name} for s in c.starships],
-        }
-        for c in chars
-    ]
-
-@router.get("/films/search")
-@safe_route
+    chars = search_resources(db, Character, Character.name, name, skip, limit)
+    log_fetched(chars, "name")
+    return chars
+
+@router.get("/films/search", response_model=list[FilmOut])
+@cached_route
 def search_films(
     title: str = Query(..., min_length=1, description="Title or partial title to search for"),
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -245,27 +404,16 @@ def search_films(
     - **limit**: Number of records to return
     - **Returns**: List of matching films with related characters and starships
     """
-    films = db.query(Film).filter(Film.title.ilike(f"%{title}%")).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and films:
-        logging.info("Fetched: " + " | ".join(f.title for f in films))
-    return [
-        {
-            "id": f.id,
-            "title": f.title,
-            "director": f.director,
-            "release_date": f.release_date,
-            "characters": [{"id": c.id, "name": c.name} for c in f.characters],
-            "starships": [{"id": s.id, "name": s.name} for s in f.starships],
-        }
-        for f in films
-    ]
-
-@router.get("/starships/search")
-@safe_route
+    films = search_resources(db, Film, Film.title, title, skip, limit)
+    log_fetched(films, "title")
+    return films
+
+@router.get("/starships/search", response_model=list[StarshipOut])
+@cached_route
 def search_starships(
     name: str = Query(..., min_length=1, description="Name or partial name to search for"),
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of records to return")
 ):
     """
@@ -276,17 +424,67 @@ def search_starships(
     - **limit**: Number of records to return
     - **Returns**: List of matching starships with related characters and films
     """
-    starships = db.query(Starship).filter(Starship.name.ilike(f"%{name}%")).offset(skip).limit(limit).all()
-    if LOG_FETCHED_OBJECTS and starships:
-        logging.info("Fetched: " + " | ".join(s.name for s in starships))
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "model": s.model,
-            "manufacturer": s.manufacturer,
-            "characters": [{"id": c.id, "name": c.name} for c in s.characters],
-            "films": [{"id": f.id, "title": f.title} for f in s.films],
-        }
-        for s in starships
-    ]
+    starships = search_resources(db, Starship, Starship.name, name, skip, limit)
+    log_fetched(starships, "name")
+    return starships
+
+# -------------------- Starts with --------------------
+@router.get("/characters/starts", response_model=list[CharacterOut])
+@cached_route
+def characters_starting_with(
+    prefix: str = Query(..., min_length=1, description="Leading part of the name"),
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
+    limit: int = Query(10, gt=0, le=100, description="Number of records to return")
+):
+    """
+    Find characters whose name starts with a prefix (autocomplete).
+
+    - **prefix**: Leading part of the name
+    - **skip**: Number of records to skip
+    - **limit**: Number of records to return
+    - **Returns**: List of matching characters with related films and starships
+    """
+    chars = prefix_resources(db, Character, Character.name, prefix, skip, limit)
+    log_fetched(chars, "name")
+    return chars
+
+@router.get("/films/starts", response_model=list[FilmOut])
+@cached_route
+def films_starting_with(
+    prefix: str = Query(..., min_length=1, description="Leading part of the title"),
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
+    limit: int = Query(10, gt=0, le=100, description="Number of records to return")
+):
+    """
+    Find films whose title starts with a prefix (autocomplete).
+
+    - **prefix**: Leading part of the title
+    - **skip**: Number of records to skip
+    - **limit**: Number of records to return
+    - **Returns**: List of matching films with related characters and starships
+    """
+    films = prefix_resources(db, Film, Film.title, prefix, skip, limit)
+    log_fetched(films, "title")
+    return films
+
+@router.get("/starships/starts", response_model=list[StarshipOut])
+@cached_route
+def starships_starting_with(
+    prefix: str = Query(..., min_length=1, description="Leading part of the name"),
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0, le=MAX_SKIP, description="Number of records to skip"),
+    limit: int = Query(10, gt=0, le=100, description="Number of records to return")
+):
+    """
+    Find starships whose name starts with a prefix (autocomplete).
+
+    - **prefix**: Leading part of the name
+    - **skip**: Number of records to skip
+    - **limit**: Number of records to return
+    - **Returns**: List of matching starships with related characters and films
+    """
+    starships = prefix_resources(db, Starship, Starship.name, prefix, skip, limit)
+    log_fetched(starships, "name")
+    return starships
@@ -0,0 +1,66 @@
+"""
+Pydantic response models for the SWAPI routes.
+
+They document the response shapes in the OpenAPI schema and let FastAPI
+validate and serialize route results with pydantic-core.
+"""
+
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+# -------------------- References (related objects) --------------------
+class CharacterRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+
+
+class FilmRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+
+
+class StarshipRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+
+
+# -------------------- Resources --------------------
+class CharacterOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    gender: Optional[str] = None
+    birth_year: Optional[str] = None
+    films: list[FilmRef] = []
+    starships: list[StarshipRef] = []
+
+
+class FilmOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    director: Optional[str] = None
+    release_date: Optional[date] = None
+    characters: list[CharacterRef] = []
+    starships: list[StarshipRef] = []
+
+
+class StarshipOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    model: Optional[str] = None
+    manufacturer: Optional[str] = None
+    characters: list[CharacterRef] = []
+    films: list[FilmRef] = []
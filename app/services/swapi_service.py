@@ -1,8 +1,20 @@
+from sqlalchemy import exists, insert, select, true
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, OperationalError
-from app.models import Character, Film, Starship
+from app.models import Character, Film, Starship, character_film, character_starship, film_starship
+import functools
+import itertools
+import json
 import logging
+import os
+import tempfile
+from datetime import date
 from app.db_exceptions import handle_db_exception
+from app.database import INSERT_PAGE_SIZE
+import asyncio
+import time
+import httpx
 import requests
 
 # -------------------- BASE --------------------
@@ -11,73 +23,326 @@ SWAPI_BASE = "https://swapi.info/api"
 Base URL for SWAPI endpoints.
 """
 
+# Full URLs of the endpoints the app syncs, built once
+_URLS = {endpoint: f"{SWAPI_BASE}/{endpoint}" for endpoint in ("people", "films", "starships")}
+
+class SwapiFetchError(Exception):
+    """Raised when an endpoint can't be fetched from SWAPI; the app maps it to 502 Bad Gateway."""
+
+# Shared HTTP session: keep-alive connections are reused across endpoints and retries
+_SESSION = requests.Session()
+_SESSION.headers.update({"Accept": "application/json"})
+
+# On-disk cache of endpoint bodies keyed by ETag, revalidated with If-None-Match
+SWAPI_CACHE_DIR = os.getenv("SWAPI_CACHE_DIR", ".swapi_cache")
+
 # -------------------- Helpers --------------------
+def _cache_path(endpoint: str) -> str:
+    return os.path.join(SWAPI_CACHE_DIR, f"{endpoint}.json")
+
+def load_cached(endpoint: str):
+    """
+    Load the cached response for an endpoint.
+
+    Args:
+        endpoint (str): SWAPI endpoint, e.g., "people"
+
+    Returns:
+        dict | None: {"etag": ..., "data": [...]}, or None if nothing usable is cached
+    """
+    try:
+        with open(_cache_path(endpoint), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # A file that parses but isn't a complete entry is treated as a miss
+    if not (isinstance(cached, dict) and isinstance(cached.get("etag"), str) and "data" in cached):
+        return None
+    return cached
+
+def save_cached(endpoint: str, etag, data):
+    """
+    Cache an endpoint's items under the response ETag. Responses without an ETag are not cached.
+
+    Args:
+        endpoint (str): SWAPI endpoint, e.g., "people"
+        etag (str | None): ETag header of the response
+        data (list): Items returned for the endpoint
+    """
+    if not etag:
+        return
+    tmp_path = None
+    try:
+        os.makedirs(SWAPI_CACHE_DIR, exist_ok=True)
+        # A unique temp file per writer, so concurrent syncs can't clobber each other's
+        with tempfile.NamedTemporaryFile(
+            "w", dir=SWAPI_CACHE_DIR, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            tmp_path = f.name
+            json.dump({"etag": etag, "data": data}, f)
+        os.replace(tmp_path, _cache_path(endpoint))
+    except OSError as e:
+        logging.warning(f"Could not cache SWAPI {endpoint}: {e}")
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+def conditional_headers(cached):
+    """If-None-Match header for a cached entry, so an unchanged endpoint answers 304."""
+    return {"If-None-Match": cached["etag"]} if cached else {}
+
+def parse_items(data):
+    """SWAPI.info returns dict of items, not paginated 'results'"""
+    if isinstance(data, dict):
+        return list(data.values())
+    return data
+
 def fetch_from_swapi(endpoint: str, retries: int = 3, delay: int = 2, fail_fast: bool = True):
     """
     Fetch data from SWAPI with retries and error handling.
+    A cached copy is revalidated with its ETag and reused on 304 Not Modified.
+
+    With fail_fast=False (scripts) each endpoint is fetched once per process and
+    then served from memory; failed fetches are not memoized.
 
     Args:
         endpoint (str): SWAPI endpoint, e.g., "people", "films", "starships"
         retries (int): Number of retry attempts
         delay (int): Delay between retries in seconds
-        fail_fast (bool): If True, raises HTTPException on failure (for FastAPI routes)
+        fail_fast (bool): If True, raises SwapiFetchError on failure (for FastAPI routes)
                           If False, returns empty list (for scripts)
 
     Returns:
         list: List of SWAPI items
 
     Raises:
-        HTTPException: If fetching fails and fail_fast is True
+        SwapiFetchError: If fetching fails and fail_fast is True
+    """
+    if fail_fast:
+        return _fetch(endpoint, retries, delay)
+    try:
+        return list(_fetch_memoized(endpoint, retries, delay))
+    except SwapiFetchError:
+        return []
+
+@functools.lru_cache(maxsize=32)
+def _fetch_memoized(endpoint: str, retries: int, delay: int):
+    # A tuple so the memoized result can't be mutated by callers
+    return tuple(_fetch(endpoint, retries, delay))
+
+def _fetch(endpoint: str, retries: int, delay: int):
     """
-    import time
-    import json
-    from fastapi import HTTPException
+    Fetch one endpoint, retrying on request or JSON errors.
 
-    url = f"{SWAPI_BASE}/{endpoint}"
+    Raises:
+        SwapiFetchError: If every attempt fails
+    """
+    url = _URLS.get(endpoint) or f"{SWAPI_BASE}/{endpoint}"
+    cached = load_cached(endpoint)
     for attempt in range(1, retries + 1):
         try:
-            resp = requests.get(url, timeout=10)
+            resp = _SESSION.get(url, headers=conditional_headers(cached), timeout=10)
+            if cached and resp.status_code == 304:
+                return cached["data"]
             resp.raise_for_status()
-            data = resp.json()
-            # SWAPI.info returns dict of items, not paginated 'results'
-            if isinstance(data, dict):
-                return list(data.values())
-            return data
+            items = parse_items(resp.json())
+            save_cached(endpoint, resp.headers.get("ETag"), items)
+            return items
         except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            logging.warning(f"[Attempt {attempt}/{retries}] Error fetching {endpoint}: {e}")
+            if attempt == retries:
+                logging.error(f"Failed to fetch {endpoint} after {retries} attempts")
+                raise SwapiFetchError(f"Failed to fetch {endpoint} from SWAPI")
+            time.sleep(delay)
+
+async def fetch_from_swapi_async(client: httpx.AsyncClient, endpoint: str, retries: int = 3,
+                                 delay: int = 2, fail_fast: bool = True):
+    """
+    Async counterpart of fetch_from_swapi, using a shared httpx client.
+
+    Args:
+        client (httpx.AsyncClient): Client with base_url set to SWAPI_BASE
+        endpoint (str): SWAPI endpoint, e.g., "people", "films", "starships"
+        retries (int): Number of retry attempts
+        delay (int): Delay between retries in seconds
+        fail_fast (bool): If True, raises SwapiFetchError on failure; if False, returns empty list
+
+    Returns:
+        list: List of SWAPI items
+
+    Raises:
+        SwapiFetchError: If fetching fails and fail_fast is True
+    """
+    cached = load_cached(endpoint)
+    for attempt in range(1, retries + 1):
+        try:
+            # Relative to the client's base_url
+            resp = await client.get(endpoint, headers=conditional_headers(cached))
+            if cached and resp.status_code == 304:
+                return cached["data"]
+            resp.raise_for_status()
+            items = parse_items(resp.json())
+            save_cached(endpoint, resp.headers.get("ETag"), items)
+            return items
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
             logging.warning(f"[Attempt {attempt}/{retries}] Error fetching {endpoint}: {e}")
             if attempt == retries:
                 logging.error(f"Failed to fetch {endpoint} after {retries} attempts")
                 if fail_fast:
-                    raise HTTPException(status_code=502, detail=f"Failed to fetch {endpoint} from SWAPI")
+                    raise SwapiFetchError(f"Failed to fetch {endpoint} from SWAPI")
                 else:
                     return []
-            time.sleep(delay)
+            await asyncio.sleep(delay)
+
+async def fetch_all_async():
+    """
+    Fetch characters, films and starships concurrently over one pooled connection set.
+
+    Returns:
+        tuple: (characters, films, starships) lists of SWAPI items
+    """
+    async with httpx.AsyncClient(
+        base_url=SWAPI_BASE, headers={"Accept": "application/json"}, timeout=10
+    ) as client:
+        chars, films, ships = await asyncio.gather(
+            fetch_from_swapi_async(client, "people"),
+            fetch_from_swapi_async(client, "films"),
+            fetch_from_swapi_async(client, "starships"),
+        )
+    return chars, films, ships
+
+def fetch_all():
+    """
+    Fetch all SWAPI entities concurrently from synchronous code.
+
+    The client lives for one call: it is bound to the event loop that
+    asyncio.run creates, so it can't be reused across calls.
+
+    Returns:
+        tuple: (characters, films, starships) lists of SWAPI items
+    """
+    return asyncio.run(fetch_all_async())
+
+def parse_date(value):
+    """
+    Parse an ISO date string (YYYY-MM-DD) as returned by SWAPI.
+
+    Args:
+        value (str): date string, e.g. "1977-05-25"
+
+    Returns:
+        date | None: parsed date, or None if missing or malformed
+    """
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def chunked(rows, size):
+    """
+    Split an iterable into consecutive lists of at most `size` items, consuming it lazily.
+
+    Args:
+        rows (iterable): Items to split
+        size (int): Maximum batch length
+
+    Returns:
+        generator: Batches of rows, in order
+    """
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+@functools.lru_cache(maxsize=None)
+def upsert_statement(dialect_name: str, model_class, unique_field: str):
+    """
+    Build a single-statement bulk insert that leaves rows with an existing unique value untouched.
+    Statements are built once per (dialect, model, field) and reused, so SQLAlchemy's
+    compiled cache is hit on every later store.
+
+    Args:
+        dialect_name (str): Name of the database dialect, e.g. "mysql", "sqlite"
+        model_class: SQLAlchemy model class to insert into
+        unique_field (str): Column with a UNIQUE constraint that detects duplicates
+
+    Returns:
+        Insert | None: Dialect-specific INSERT, or None if the dialect has no conflict clause
+    """
+    table = model_class.__table__
+    if dialect_name in ("mysql", "mariadb"):
+        stmt = mysql.insert(table)
+        # No-op update: existing rows keep their values
+        return stmt.on_duplicate_key_update({unique_field: stmt.inserted[unique_field]})
+    if dialect_name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=[unique_field])
+    if dialect_name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing(index_elements=[unique_field])
+    return None
+
+@functools.lru_cache(maxsize=None)
+def model_columns(model_class):
+    """
+    Column keys of a model's table, computed once per model.
+
+    Args:
+        model_class: SQLAlchemy model class
+
+    Returns:
+        frozenset: Names of the table's columns
+    """
+    return frozenset(model_class.__table__.columns.keys())
 
 def store_objects(db: Session, model_class, data_list, unique_field):
     """
     Store a list of objects into the database with uniqueness check.
 
+    Rows are written with one bulk UPSERT where the dialect supports it, letting
+    the UNIQUE constraint on unique_field skip existing rows; other dialects
+    fall back to checking against the set of existing unique values.
+    Changes are flushed, not committed: the caller owns the transaction.
+
     Args:
         db (Session): SQLAlchemy database session
         model_class: SQLAlchemy model class to store
-        data_list (list): List of dicts containing object data
+        data_list (iterable): Dicts containing object data; consumed once, in batches
         unique_field (str): Field to check uniqueness
 
     Returns:
         None
 
     Raises:
-        Exception: If database commit fails
+        Exception: If the database write fails (the transaction is rolled back)
     """
-    added_count = 0
+    data_iter = iter(data_list)
+    first = next(data_iter, None)
+    if first is None:
+        logging.info(f"No {model_class.__name__} to store")
+        return
+    columns = model_columns(model_class)
+    rows = ({k: v for k, v in data.items() if k in columns} for data in itertools.chain([first], data_iter))
     try:
-        for data in data_list:
-            if not db.query(model_class).filter(getattr(model_class, unique_field) == data[unique_field]).first():
-                obj = model_class(**{k: v for k, v in data.items() if hasattr(model_class, k)})
-                db.add(obj)
-                added_count += 1
-        db.commit()
-        logging.info(f"Stored {added_count}/{len(data_list)} {model_class.__name__}")
+        stmt = upsert_statement(db.get_bind().dialect.name, model_class, unique_field)
+        if stmt is not None:
+            # executemany form: one cached statement, sent in bounded multi-row batches
+            stored = 0
+            for batch in chunked(rows, INSERT_PAGE_SIZE):
+                db.execute(stmt, batch)
+                stored += len(batch)
+            logging.info(f"Upserted {stored} {model_class.__name__} by {unique_field}")
+        else:
+            # One SELECT of the existing keys instead of one lookup per row
+            existing = set(db.scalars(select(getattr(model_class, unique_field))))
+            added_count = total = 0
+            for row in rows:
+                total += 1
+                if row[unique_field] not in existing:
+                    db.add(model_class(**row))
+                    existing.add(row[unique_field])
+                    added_count += 1
+            logging.info(f"Stored {added_count}/{total} {model_class.__name__}")
+        db.flush()
     except Exception as e:
         db.rollback()
         handle_db_exception(e, context=f"storing {model_class.__name__}")
@@ -104,13 +369,14 @@ def store_characters(db: Session, characters_data):
     Returns:
         None
     """
-    processed = []
-    for c in characters_data:
-        processed.append({
+    processed = (
+        {
             "name": c.get("name"),
             "gender": c.get("gender"),
             "birth_year": c.get("birth_year"),
-        })
+        }
+        for c in characters_data
+    )
     store_objects(db, Character, processed, "name")
 
 # -------------------- Films --------------------
@@ -134,13 +400,14 @@ def store_films(db: Session, films_data):
     Returns:
         None
     """
-    processed = []
-    for f in films_data:
-        processed.append({
+    processed = (
+        {
             "title": f.get("title"),
             "director": f.get("director"),
-            "release_date": f.get("release_date"),
-        })
+            "release_date": parse_date(f.get("release_date")),
+        }
+        for f in films_data
+    )
     store_objects(db, Film, processed, "title")
 
 # -------------------- Starships --------------------
@@ -164,20 +431,32 @@ def store_starships(db: Session, starships_data):
     Returns:
         None
     """
-    processed = []
-    for s in starships_data:
-        processed.append({
+    processed = (
+        {
             "name": s.get("name"),
             "model": s.get("model"),
             "manufacturer": s.get("manufacturer"),
-        })
+        }
+        for s in starships_data
+    )
     store_objects(db, Starship, processed, "name")
 
 # -------------------- Relationship Filler --------------------
+# Association table -> (left model, right model); its columns are ordered the same way
+RELATIONSHIP_TABLES = (
+    (character_film, Character, Film),
+    (character_starship, Character, Starship),
+    (film_starship, Film, Starship),
+)
+
 def fill_relationships(db: Session):
     """
     Fill many-to-many relationships between characters, films, and starships.
 
+    Each association table gets one INSERT ... SELECT of the cross join of its
+    two sides, skipping pairs that already exist, so the work stays in the database.
+    Changes are flushed, not committed: the caller owns the transaction.
+
     Args:
         db (Session): Database session
 
@@ -185,22 +464,19 @@ def fill_relationships(db: Session):
         None
     """
     try:
-        characters = db.query(Character).all()
-        films = db.query(Film).all()
-        starships = db.query(Starship).all()
-
-        for c in characters:
-            for f in films:
-                if f not in c.films:
-                    c.films.append(f)
-            for s in starships:
-                if s not in c.starships:
-                    c.starships.append(s)
-        for f in films:
-            for s in starships:
-                if s not in f.starships:
-                    f.starships.append(s)
-        db.commit()
+        # On MySQL, INSERT IGNORE against the composite primary key skips existing
+        # pairs more simply and cheaply than a per-row NOT EXISTS probe
+        use_ignore = db.get_bind().dialect.name in ("mysql", "mariadb")
+        for table, left, right in RELATIONSHIP_TABLES:
+            left_col, right_col = table.c
+            pairs = select(left.id, right.id).join(right, true())
+            if use_ignore:
+                stmt = insert(table).prefix_with("IGNORE")
+            else:
+                pairs = pairs.where(~exists().where(left_col == left.id, right_col == right.id))
+                stmt = insert(table)
+            db.execute(stmt.from_select([left_col, right_col], pairs))
+        db.flush()
         logging.info("Relationships filled successfully.")
     except Exception as e:
         db.rollback()
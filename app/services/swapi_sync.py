@@ -5,11 +5,27 @@ Provides functions to fetch and store SWAPI entities (characters, films, starshi
 and populate the many-to-many relationships in the database.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from app.services import swapi_service
+
+def _store_in_own_session(bind, store, rows):
+    """Run one store function on its own pooled connection and commit it."""
+    with Session(bind=bind) as session:
+        store(session, rows)
+        session.commit()
+
 def sync_all(db):
     """
     Fetch all SWAPI entities and store them in the database, including
     filling many-to-many relationships between characters, films, and starships.
 
+    Characters, films and starships go to disjoint tables, so on pooled
+    databases they are stored concurrently, each on its own connection and
+    transaction; relationships are filled after all three have committed.
+    SQLite allows a single writer, so there everything runs in one transaction
+    on `db` and a failure at any step rolls back the whole sync.
+
     Args:
         db (Session): SQLAlchemy database session
 
@@ -19,22 +35,27 @@ def sync_all(db):
     Raises:
         Exception: If any fetch/store operation or relationship filling fails
     """
-    from app.services.swapi_service import (
-        fetch_characters, store_characters,
-        fetch_films, store_films,
-        fetch_starships, store_starships,
-        fill_relationships
-    )
-
-    # Fetch and store base entities
-    chars = fetch_characters()
-    store_characters(db, chars)
-
-    films = fetch_films()
-    store_films(db, films)
-
-    ships = fetch_starships()
-    store_starships(db, ships)
-
-    # Populate association tables
-    fill_relationships(db)
+    # Fetch all endpoints concurrently, then store base entities
+    chars, films, ships = swapi_service.fetch_all()
+    jobs = [
+        (swapi_service.store_characters, chars),
+        (swapi_service.store_films, films),
+        (swapi_service.store_starships, ships),
+    ]
+    bind = db.get_bind()
+    try:
+        if bind.dialect.name == "sqlite":
+            for store, rows in jobs:
+                store(db, rows)
+        else:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = [executor.submit(_store_in_own_session, bind, store, rows) for store, rows in jobs]
+                for future in futures:
+                    future.result()
+
+        # Populate association tables
+        swapi_service.fill_relationships(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
@@ -1,9 +1,18 @@
+import argparse
+import functools
+
+
 def parse_db_arguments(require_root=False):
     """
     Returns parsed database arguments.
     If require_root is True, root_user and root_password are required (for create_db).
     """
-    import argparse
+    return _build_parser(require_root).parse_args()
+
+
+@functools.lru_cache(maxsize=2)
+def _build_parser(require_root):
+    """Build the argument parser once per require_root value."""
     parser = argparse.ArgumentParser(description="Database arguments for SWAPI project")
     
     args_map = {
@@ -29,4 +38,4 @@ def parse_db_arguments(require_root=False):
             type=type(default) if default is not None else str,
         )
     
-    return parser.parse_args()
+    return parser
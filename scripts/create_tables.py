@@ -2,6 +2,8 @@ import os
 import sys
 from sqlalchemy.exc import OperationalError
 from scripts.load_db_config import get_db_config
+import app.models  # ensure all models are imported so Base.metadata is populated
+from app import database
 
 from app.logging_config import logging, setup_logging
 from app.db_exceptions import handle_db_exception
@@ -18,12 +20,9 @@ setup_logging(
 # -------------------------------------------------
 
 def create_tables(db_user, db_password, db_host="localhost", db_name="swapi_db", db_port=3306):
-    import app.models  # ensure all models are imported so Base.metadata is populated
-    from app.database import init_db, Base
-
     try:
-        engine = init_db(db_user, db_password, db_host, db_name, db_port)
-        Base.metadata.create_all(bind=engine)
+        engine = database.init_db(db_user, db_password, db_host, db_name, db_port)
+        database.Base.metadata.create_all(bind=engine)
         logging.info("Database tables created successfully!")
     except Exception as e:
         handle_db_exception(e, context="creating tables")
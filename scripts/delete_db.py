@@ -1,5 +1,6 @@
-import pymysql
 import os
+import sys
+import pymysql
 from app.logging_config import logging, setup_logging
 from app.db_exceptions import handle_db_exception
 
@@ -15,7 +16,6 @@ setup_logging(
 # -------------------------------------------------
 
 def drop_database(host, port, root_user, root_password, db_name):
-    import sys
     connection = None
     try:
         connection = pymysql.connect(host=host, user=root_user, password=root_password, port=port)
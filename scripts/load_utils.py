@@ -1,7 +1,24 @@
+import configparser
+import functools
+import os
+
+
 def load_config_ini(path):
-    import configparser, os
-    if not os.path.exists(path):
+    """
+    Read the [database] section of an .ini file.
+    Parsed results are cached per (absolute path, modification time in ns),
+    so the file is only re-read after it changes.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
         return None
+    cfg = _parse_config_ini(os.path.abspath(path), mtime_ns)
+    return dict(cfg) if cfg is not None else None
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_config_ini(path, mtime_ns):
     config = configparser.ConfigParser()
     config.read(path)
     if "database" not in config:
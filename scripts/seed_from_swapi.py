@@ -0,0 +1,121 @@
+import csv
+import os
+import sys
+import tempfile
+import pymysql
+from scripts.load_db_config import get_db_config
+from app.logging_config import logging, setup_logging
+from app.db_exceptions import handle_db_exception
+from app.services.swapi_service import fetch_from_swapi, parse_date
+
+# -------------------- Logging --------------------
+
+setup_logging(
+    log_to_terminal=True,
+    log_to_file=False,
+    level=logging.INFO,
+    log_dir="logs"
+)
+
+# -------------------------------------------------
+
+# SWAPI endpoint -> (table, columns loaded from the endpoint's items)
+SEED_TABLES = {
+    "people": ("character", ["name", "gender", "birth_year"]),
+    "films": ("film", ["title", "director", "release_date"]),
+    "starships": ("starship", ["name", "model", "manufacturer"]),
+}
+
+# Every character/film/starship is related to every other side, as in fill_relationships
+RELATIONSHIP_SQL = [
+    "INSERT IGNORE INTO character_film (character_id, film_id) "
+    "SELECT c.id, f.id FROM `character` c CROSS JOIN film f",
+    "INSERT IGNORE INTO character_starship (character_id, starship_id) "
+    "SELECT c.id, s.id FROM `character` c CROSS JOIN starship s",
+    "INSERT IGNORE INTO film_starship (film_id, starship_id) "
+    "SELECT f.id, s.id FROM film f CROSS JOIN starship s",
+]
+
+# With ESCAPED BY '' (csv-style quoting, literal backslashes) LOAD DATA reads an unquoted NULL as SQL NULL
+NULL = "NULL"
+
+
+def csv_value(column, value):
+    """Format one field for LOAD DATA: missing values become NULL, dates ISO strings."""
+    if column == "release_date":
+        value = parse_date(value)
+        value = value.isoformat() if value else None
+    return NULL if value is None else value
+
+
+def write_csv(items, columns):
+    """
+    Write SWAPI items to a temporary CSV file with a header row.
+
+    Returns:
+        str: Path of the CSV file; the caller removes it (it is removed here if writing fails)
+    """
+    with tempfile.NamedTemporaryFile("w", newline="", suffix=".csv", delete=False, encoding="utf-8") as f:
+        try:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(columns)
+            for item in items:
+                writer.writerow([csv_value(column, item.get(column)) for column in columns])
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+        return f.name
+
+
+def load_csv(cursor, path, table, columns):
+    """Bulk load a CSV file into a table, skipping rows whose unique key already exists."""
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE `{table}` CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+        "LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+        f"({', '.join(columns)})",
+        (path,),
+    )
+    return cursor.rowcount
+
+
+def seed_from_swapi(db_user, db_password, db_host="localhost", db_name="swapi_db", db_port=3306):
+    """
+    Seed freshly created tables from SWAPI with LOAD DATA LOCAL INFILE.
+    Much faster than row inserts for the initial load; run create_tables first.
+    """
+    connection = None
+    paths = []
+    try:
+        connection = pymysql.connect(
+            host=db_host, user=db_user, password=db_password, database=db_name,
+            port=db_port, charset="utf8mb4", local_infile=True,
+        )
+        with connection.cursor() as cursor:
+            for endpoint, (table, columns) in SEED_TABLES.items():
+                items = fetch_from_swapi(endpoint, fail_fast=False)
+                paths.append(write_csv(items, columns))
+                loaded = load_csv(cursor, paths[-1], table, columns)
+                logging.info(f"Loaded {loaded}/{len(items)} rows into '{table}'.")
+            for sql in RELATIONSHIP_SQL:
+                cursor.execute(sql)
+            logging.info("Relationships filled successfully.")
+        connection.commit()
+    except Exception as e:
+        handle_db_exception(e, context="seeding tables from SWAPI")
+        sys.exit(1)
+    finally:
+        if connection:
+            connection.close()
+        for path in paths:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    logging.info(f"Running script: {os.path.abspath(__file__)}")
+    cfg = get_db_config(
+        require_root=False,
+        expected_keys=["db_user", "db_password", "db_host", "db_name", "db_port"]
+    )
+    seed_from_swapi(**cfg)
@@ -0,0 +1,87 @@
+# tests/conftest.py
+
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+# Import the heavy test dependencies once, before any test module is collected,
+# and resolve the SQLite dialect up front so its plugin lookup isn't repeated
+# by every file that builds an engine. Test modules keep their own imports;
+# after this they are plain sys.modules hits.
+from fastapi.testclient import TestClient  # noqa: F401
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import registry
+from sqlalchemy.orm import Session, sessionmaker  # noqa: F401
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+
+registry.load("sqlite")
+
+
+# No test needs real wall-clock waits (e.g. fetch_from_swapi's retry delay)
+@pytest.fixture(autouse=True, scope="session")
+def _no_sleep():
+    with patch("time.sleep", lambda *_: None):
+        yield
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    # pysqlite starts transactions lazily and ignores SAVEPOINT semantics;
+    # let SQLAlchemy emit BEGIN itself so nested transactions work.
+    # Durability is irrelevant for a throwaway in-memory database.
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session")
+def make_engine():
+    """Factory for in-memory SQLite engines with the schema created; all are disposed at session end"""
+    engines = []
+
+    def make():
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,   # 🔑 ensures same in-memory DB is reused
+            future=True,
+            query_cache_size=1200,
+        )
+        event.listen(engine, "connect", _configure_connection)
+        event.listen(engine, "begin", _emit_begin)
+        Base.metadata.create_all(engine)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def savepoint_session():
+    """
+    Context manager factory: a Session inside a transaction that is rolled back on exit,
+    so the test's commits only release SAVEPOINTs. Keyword arguments go to Session().
+    """
+    @contextmanager
+    def open_session(engine, **session_options):
+        connection = engine.connect()
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint", **session_options)
+        try:
+            yield session
+        finally:
+            session.close()
+            transaction.rollback()
+            connection.close()
+
+    return open_session
@@ -2,8 +2,9 @@
 import pytest
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db, SessionLocal, init_db
-from unittest.mock import patch
+from sqlalchemy.pool import StaticPool
+from app.database import Base, get_db, SessionLocal, init_db, _set_sqlite_pragmas
+from unittest.mock import patch, MagicMock
 
 # -------------------- Fixtures --------------------
 @pytest.fixture(scope="module")
@@ -54,8 +55,8 @@ def test_get_db_without_init(monkeypatch):
         next(get_db())
 
 def test_init_db_mysql_branch():
-    fake_engine = object()
-    with patch("app.database.create_engine", return_value=fake_engine):
+    fake_engine = MagicMock()
+    with patch("app.database.create_engine", return_value=fake_engine) as mock_create:
         engine = init_db(
             db_user="user",
             db_password="pass",
@@ -65,10 +66,20 @@ def test_init_db_mysql_branch():
             driver="mysql+pymysql"
         )
     assert engine is fake_engine
+    kwargs = mock_create.call_args[1]
+    assert kwargs["pool_size"] == 20
+    assert kwargs["max_overflow"] == 30
+    assert kwargs["pool_timeout"] == 5
+    assert kwargs["pool_recycle"] == 3600
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["isolation_level"] == "READ COMMITTED"
+    assert kwargs["insertmanyvalues_page_size"] == 1000
+    assert kwargs["connect_args"] == {"charset": "utf8mb4"}
 
 def test_init_db_sqlite_branch():
-    fake_engine = object()
-    with patch("app.database.create_engine", return_value=fake_engine):
+    fake_engine = MagicMock()
+    with patch("app.database.create_engine", return_value=fake_engine) as mock_create, \
+         patch("app.database.event.listen") as mock_listen:
         engine = init_db(
             db_user="",
             db_password="",
@@ -77,3 +88,41 @@ def test_init_db_sqlite_branch():
             driver="sqlite"
         )
     assert engine is fake_engine
+    kwargs = mock_create.call_args[1]
+    assert kwargs["poolclass"] is StaticPool
+    assert kwargs["connect_args"] == {"check_same_thread": False}
+    mock_listen.assert_called_once_with(fake_engine, "connect", _set_sqlite_pragmas)
+
+def test_init_db_sqlite_file_uses_default_pool(tmp_path):
+    engine = init_db("", "", "", str(tmp_path / "test.db"), driver="sqlite")
+    assert not isinstance(engine.pool, StaticPool)
+    # Each checkout gets its own DBAPI connection, so transactions stay separate
+    with engine.connect() as first, engine.connect() as second:
+        assert first.connection.dbapi_connection is not second.connection.dbapi_connection
+    engine.dispose()
+
+def test_sqlite_pragmas_applied(tmp_path):
+    engine = init_db("", "", "", str(tmp_path / "test.db"), driver="sqlite")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    engine.dispose()
+
+def test_request_scope_shares_and_removes_session():
+    init_db(db_user="", db_password="", db_host="", db_name=":memory:", driver="sqlite")
+    from app import database
+
+    token = database.open_request_scope()
+    db = get_db()
+    assert get_db() is db
+    database.close_request_scope(token)
+
+    # Outside the request scope a different session is handed out
+    assert get_db() is not db
+
+def test_init_db_disposes_previous_engine():
+    first = init_db("", "", "", ":memory:", driver="sqlite")
+    with patch.object(first, "dispose") as mock_dispose:
+        second = init_db("", "", "", ":memory:", driver="sqlite")
+    mock_dispose.assert_called_once()
+    assert second is not first
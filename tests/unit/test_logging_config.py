@@ -3,7 +3,7 @@
 import logging
 from pathlib import Path
 import pytest
-from app.logging_config import setup_logging, ColorFormatter
+from app.logging_config import setup_logging, stop_logging, ColorFormatter
 
 def test_color_formatter_wraps_message():
     fmt = ColorFormatter("%(levelname)s: %(message)s")
@@ -17,28 +17,90 @@ def test_color_formatter_wraps_message():
     assert result.endswith("\033[0m")
     assert "Test message" in result
 
+def active_handlers():
+    """Handlers the root logger's queue listener dispatches to."""
+    root = logging.getLogger()
+    return [
+        h for qh in root.handlers if isinstance(qh, logging.handlers.QueueHandler)
+        for h in qh.listener.handlers
+    ]
+
+def drain_queue():
+    """Wait until the listener thread has handled every queued record."""
+    for qh in logging.getLogger().handlers:
+        if isinstance(qh, logging.handlers.QueueHandler):
+            qh.queue.join()
+
+def is_file_handler(handler):
+    """File handlers are wrapped in a MemoryHandler buffer."""
+    return (
+        isinstance(handler, logging.handlers.MemoryHandler)
+        and isinstance(handler.target, logging.handlers.RotatingFileHandler)
+    )
+
 def test_log_dir_creation(tmp_path):
     log_dir = tmp_path / "logs"
     setup_logging(log_to_terminal=False, log_to_file=True, log_dir=log_dir)
     # Ensure directory is created
     assert log_dir.exists()
     # Ensure file handler is added
-    root = logging.getLogger()
-    assert any(isinstance(h, logging.handlers.RotatingFileHandler) for h in root.handlers)
+    assert any(is_file_handler(h) for h in active_handlers())
 
 def test_terminal_handler_added(tmp_path):
     setup_logging(log_to_terminal=True, log_to_file=False, log_dir=tmp_path)
-    root = logging.getLogger()
-    assert any(isinstance(h, logging.StreamHandler) for h in root.handlers)
+    assert any(isinstance(h, logging.StreamHandler) for h in active_handlers())
     # No file handler
-    assert all(not isinstance(h, logging.handlers.RotatingFileHandler) for h in root.handlers)
+    assert not any(is_file_handler(h) for h in active_handlers())
 
 def test_file_and_terminal_handlers(tmp_path):
     setup_logging(log_to_terminal=True, log_to_file=True, log_dir=tmp_path)
-    root = logging.getLogger()
-    handler_types = [type(h) for h in root.handlers]
+    handler_types = [type(h) for h in active_handlers()]
     assert logging.StreamHandler in handler_types
-    assert logging.handlers.RotatingFileHandler in handler_types
+    assert any(is_file_handler(h) for h in active_handlers())
+
+def test_root_logger_only_enqueues_records(tmp_path):
+    setup_logging(log_to_terminal=True, log_to_file=True, log_dir=tmp_path)
+    root = logging.getLogger()
+    assert [type(h) for h in root.handlers] == [logging.handlers.QueueHandler]
+
+def test_file_logs_are_buffered_until_flush(tmp_path):
+    from app.logging_config import flush_logs
+    setup_logging(log_to_terminal=False, log_to_file=True, log_dir=tmp_path)
+    log_file = tmp_path / "app.log"
+
+    logging.info("buffered message")
+    drain_queue()
+    assert "buffered message" not in log_file.read_text()
+
+    flush_logs()
+    assert "buffered message" in log_file.read_text()
+
+def test_error_logs_flush_immediately(tmp_path):
+    setup_logging(log_to_terminal=False, log_to_file=True, log_dir=tmp_path)
+    logging.error("urgent message")
+    drain_queue()
+    assert "urgent message" in (tmp_path / "app.log").read_text()
+
+def test_stop_logging_writes_pending_records(tmp_path):
+    setup_logging(log_to_terminal=False, log_to_file=True, log_dir=tmp_path)
+    logging.info("pending message")
+    stop_logging()
+    assert "pending message" in (tmp_path / "app.log").read_text()
+    assert logging.getLogger().handlers == []
+
+def test_stop_logging_stops_flush_thread_and_setup_restarts_it(tmp_path):
+    from app import logging_config
+
+    setup_logging(log_to_terminal=False, log_to_file=True, log_dir=tmp_path)
+    first = logging_config._flush_thread
+    assert first.is_alive()
+    stop_logging()
+    assert not first.is_alive()
+    assert logging_config._flush_thread is None
+
+    setup_logging(log_to_terminal=False, log_to_file=True, log_dir=tmp_path)
+    assert logging_config._flush_thread is not first and logging_config._flush_thread.is_alive()
+    stop_logging()
 
 @pytest.mark.parametrize("level,ansi", [
     (logging.DEBUG, "\033[37m"),
@@ -1,5 +1,6 @@
 # tests/test_database.py
 import pytest
+from datetime import date
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -37,7 +38,7 @@ def test_create_character(session):
     assert db_char.birth_year == "19BBY"
 
 def test_create_film(session):
-    film = Film(title="A New Hope", director="George Lucas", release_date="1977-05-25")
+    film = Film(title="A New Hope", director="George Lucas", release_date=date(1977, 5, 25))
     session.add(film)
     session.commit()
 
@@ -86,3 +87,65 @@ def test_film_starship_relationship(session):
     db_film = session.query(Film).filter_by(title="Empire Strikes Back").first()
     assert len(db_film.starships) == 1
     assert db_film.starships[0].name == "X-Wing"
+
+def test_search_and_association_columns_are_indexed():
+    def indexed_columns(table):
+        return {c.name for idx in Base.metadata.tables[table].indexes for c in idx.columns}
+
+    assert "name" in indexed_columns("character")
+    assert "title" in indexed_columns("film")
+    assert "name" in indexed_columns("starship")
+    assert indexed_columns("character_film") == {"film_id"}
+    assert indexed_columns("character_starship") == {"starship_id"}
+    assert indexed_columns("film_starship") == {"starship_id"}
+
+def test_association_tables_have_composite_primary_keys():
+    def pk_columns(table):
+        return [c.name for c in Base.metadata.tables[table].primary_key.columns]
+
+    assert pk_columns("character_film") == ["character_id", "film_id"]
+    assert pk_columns("character_starship") == ["character_id", "starship_id"]
+    assert pk_columns("film_starship") == ["film_id", "starship_id"]
+
+def create_index_ddl(url):
+    """CREATE INDEX statements create_all would emit for a dialect, keyed by index name"""
+    from sqlalchemy import create_mock_engine
+    from sqlalchemy.schema import CreateIndex
+
+    statements = []
+    mock = create_mock_engine(url, lambda sql, *args, **kwargs: statements.append(sql))
+    Base.metadata.create_all(mock, checkfirst=False)
+    return {s.element.name: str(s.compile(dialect=mock.dialect))
+            for s in statements if isinstance(s, CreateIndex)}
+
+def created_indexes(url):
+    return set(create_index_ddl(url))
+
+def test_lowercase_search_indexes_are_postgresql_only(engine):
+    from sqlalchemy import text
+
+    lower_indexes = {"ix_character_name_lower", "ix_film_title_lower", "ix_starship_name_lower"}
+    assert lower_indexes <= created_indexes("postgresql+psycopg2://")
+    assert not lower_indexes & created_indexes("mysql+pymysql://")
+    with engine.connect() as conn:
+        names = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert not lower_indexes & names
+
+def test_prefix_pattern_indexes_are_postgresql_only():
+    ddl = create_index_ddl("postgresql+psycopg2://")
+    for name in ("ix_character_name_pattern", "ix_film_title_pattern", "ix_starship_name_pattern"):
+        assert "varchar_pattern_ops" in ddl[name]
+    assert not {name for name in created_indexes("mysql+pymysql://") if name.endswith("_pattern")}
+
+def test_pg_trgm_extension_is_created_before_tables_on_postgresql():
+    from sqlalchemy import create_mock_engine
+
+    def ddl(url):
+        statements = []
+        mock = create_mock_engine(url, lambda sql, *args, **kwargs: statements.append(sql))
+        Base.metadata.create_all(mock, checkfirst=False)
+        return [str(s.compile(dialect=mock.dialect)).strip() for s in statements]
+
+    postgres = ddl("postgresql+psycopg2://")
+    assert postgres[0] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    assert not any("pg_trgm" in sql for sql in ddl("mysql+pymysql://"))
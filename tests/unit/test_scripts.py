@@ -1,24 +1,30 @@
 # tests/test_db_scripts.py
 
 import pytest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock
 import sys
+import configparser
 import os
+from types import SimpleNamespace
 
 from scripts.args_utils import parse_db_arguments
 from scripts.create_db import create_database
 from scripts.create_tables import create_tables
 from scripts.delete_db import drop_database
 from scripts.load_db_config import get_db_config
+from scripts import load_utils
 from scripts.load_utils import load_config_ini
+from scripts.seed_from_swapi import seed_from_swapi
 
 
 # ---------------------- create_database / drop_database ----------------------
-@patch("scripts.create_db.pymysql.connect")
-@patch("scripts.create_db.logging.info")
-def test_create_database_success(mock_log, mock_connect):
-    mock_conn = MagicMock()
-    mock_connect.return_value = mock_conn
+@pytest.fixture
+def db_script_mocks():
+    # create_db and delete_db share the pymysql and logging modules, so one patch of each covers both
+    with patch("pymysql.connect") as connect, patch("logging.info") as log:
+        yield SimpleNamespace(connect=connect, log=log)
+
+def test_create_database_success(db_script_mocks):
     create_database(
         host="localhost",
         port=3306,
@@ -28,14 +34,10 @@ def test_create_database_success(mock_log, mock_connect):
         db_user="test_user",
         db_password="pass123"
     )
-    mock_connect.assert_called_once_with(host="localhost", user="root", password="rootpass", port=3306)
-    assert mock_log.called
+    db_script_mocks.connect.assert_called_once_with(host="localhost", user="root", password="rootpass", port=3306)
+    assert db_script_mocks.log.called
 
-@patch("scripts.delete_db.pymysql.connect")
-@patch("scripts.delete_db.logging.info")
-def test_drop_database_success(mock_log, mock_connect):
-    mock_conn = MagicMock()
-    mock_connect.return_value = mock_conn
+def test_drop_database_success(db_script_mocks):
     drop_database(
         host="localhost",
         port=3306,
@@ -43,9 +45,48 @@ def test_drop_database_success(mock_log, mock_connect):
         root_password="rootpass",
         db_name="test_db"
     )
-    mock_connect.assert_called_once()
-    assert mock_log.called
-
+    db_script_mocks.connect.assert_called_once()
+    assert db_script_mocks.log.called
+
+
+# ---------------------- seed_from_swapi ----------------------
+@patch("scripts.seed_from_swapi.fetch_from_swapi")
+@patch("scripts.seed_from_swapi.pymysql.connect")
+def test_seed_from_swapi_loads_csv_files(mock_connect, mock_fetch):
+    mock_fetch.side_effect = lambda endpoint, fail_fast: {
+        "people": [{"name": 'Luke "Red Five"', "gender": "male", "birth_year": "19BBY", "url": "x"}],
+        "films": [{"title": "A New Hope", "director": "George Lucas", "release_date": "1977-05-25"},
+                  {"title": "Unknown", "director": None, "release_date": "n/a"}],
+        "starships": [],
+    }[endpoint]
+    cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+    loaded = {}
+
+    def execute(sql, params=None):
+        if sql.startswith("LOAD DATA"):
+            with open(params[0], encoding="utf-8") as f:
+                loaded[sql.split("`")[1]] = f.read()
+    cursor.execute.side_effect = execute
+
+    seed_from_swapi("user", "pass", "localhost", "swapi_db", 3306)
+
+    assert mock_connect.call_args.kwargs["local_infile"] is True
+    assert loaded["character"] == 'name,gender,birth_year\n"Luke ""Red Five""",male,19BBY\n'
+    assert loaded["film"] == (
+        "title,director,release_date\nA New Hope,George Lucas,1977-05-25\nUnknown,NULL,NULL\n"
+    )
+    assert loaded["starship"] == "name,model,manufacturer\n"
+    statements = [c.args[0] for c in cursor.execute.call_args_list]
+    assert sum(sql.startswith("INSERT IGNORE INTO") for sql in statements) == 3
+    mock_connect.return_value.commit.assert_called_once()
+    assert not any(os.path.exists(c.args[1][0]) for c in cursor.execute.call_args_list if len(c.args) > 1)
+
+def test_write_csv_removes_file_when_writing_fails(tmp_path, monkeypatch):
+    from scripts.seed_from_swapi import write_csv
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    with pytest.raises(AttributeError):
+        write_csv([{"name": "Luke"}, None], ["name"])
+    assert list(tmp_path.iterdir()) == []
 
 # ---------------------- main (create_tables) ----------------------
 # ---------------------- main (create_tables) ----------------------
@@ -115,24 +156,55 @@ def test_parse_db_arguments_require_root(monkeypatch):
     assert args.root_password == "rootpass"
 
 
+def test_parse_db_arguments_reuses_parser(monkeypatch):
+    from scripts import args_utils
+    monkeypatch.setattr(sys, "argv", ["prog", "--db_password", "first"])
+    first = parse_db_arguments()
+    monkeypatch.setattr(sys, "argv", ["prog", "--db_password", "second"])
+    second = parse_db_arguments()
+    assert (first.db_password, second.db_password) == ("first", "second")
+    assert args_utils._build_parser(False) is args_utils._build_parser(False)
+    assert args_utils._build_parser(False) is not args_utils._build_parser(True)
+
 # ---------------------- load_config_ini ----------------------
 
-@patch("os.path.exists", return_value=True)  # ensure the file is "found"
-@patch("builtins.open", new_callable=mock_open, read_data="[database]\nDB_HOST=127.0.0.1\nDB_PORT=3306\nDB_NAME=test_db\nDB_USER=test_user\nDB_PASSWORD=pass\nROOT_USER=root\nROOT_PASSWORD=rootpass")
-def test_load_config_ini(mock_file, mock_exists):
-    path = "fake_path.ini"
-    cfg = load_config_ini(path)
+def test_load_config_ini(tmp_path):
+    path = tmp_path / "cfg.ini"
+    path.write_text("[database]\nDB_HOST=127.0.0.1\nDB_PORT=3306\nDB_NAME=test_db\nDB_USER=test_user\nDB_PASSWORD=pass\nROOT_USER=root\nROOT_PASSWORD=rootpass")
+    cfg = load_config_ini(str(path))
     assert cfg["host"] == "127.0.0.1"
     assert cfg["port"] == 3306
     assert cfg["db_name"] == "test_db"
     assert cfg["db_user"] == "test_user"
     assert cfg["db_password"] == "pass"
 
-@patch("os.path.exists", return_value=False)
-def test_load_config_ini_missing(mock_exists):
-    cfg = load_config_ini("nonexistent.ini")
+def test_load_config_ini_missing(tmp_path):
+    cfg = load_config_ini(str(tmp_path / "nope.ini"))
     assert cfg is None
 
+def test_load_config_ini_cached_until_file_changes(tmp_path):
+    ini = tmp_path / "cached.ini"
+    ini.write_text("[database]\nDB_NAME=first\n")
+    os.utime(ini, (1, 1))
+    with patch("scripts.load_utils.configparser.ConfigParser", wraps=configparser.ConfigParser) as parser:
+        first = load_config_ini(str(ini))
+        first["db_name"] = "mutated"
+        assert load_config_ini(str(ini))["db_name"] == "first"
+        assert parser.call_count == 1
+
+        ini.write_text("[database]\nDB_NAME=second\n")
+        os.utime(ini, (2, 2))
+        assert load_config_ini(str(ini))["db_name"] == "second"
+        assert parser.call_count == 2
+
+def test_load_config_ini_cache_is_keyed_by_absolute_path(tmp_path, monkeypatch):
+    (tmp_path / "cfg.ini").write_text("[database]\nDB_NAME=relative\n")
+    monkeypatch.chdir(tmp_path)
+    load_utils._parse_config_ini.cache_clear()
+    assert load_config_ini("cfg.ini")["db_name"] == "relative"
+    assert load_config_ini(str(tmp_path / "cfg.ini"))["db_name"] == "relative"
+    assert load_utils._parse_config_ini.cache_info().hits == 1
+
 
 # ---------------------- get_db_config ----------------------
 import pytest
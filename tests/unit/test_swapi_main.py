@@ -1,22 +1,46 @@
+import anyio
 import pytest
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi.testclient import TestClient
+from types import MappingProxyType
 from unittest.mock import patch, MagicMock
 
-from app.main import create_app, load_configuration, initialize_database
+from app.main import create_app, load_configuration, initialize_database, worker_thread_limit
+
+
+# Read-only so no test can leak changes into the next
+FAKE_CONFIG = MappingProxyType({
+    "DB_USER": "user",
+    "DB_PASSWORD": "pass",
+    "DB_HOST": "localhost",
+    "DB_NAME": "dbname",
+    "DB_PORT": 3306,
+})
 
 
 # -------------------- Fixture for app --------------------
-@pytest.fixture
+# Built once; tests only add throwaway routes, which restore_routes removes again
+@pytest.fixture(scope="session")
 def app():
     return create_app(config=None)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client(app):
     # Disable exception propagation to test handlers
     return TestClient(app, raise_server_exceptions=False)
 
+@pytest.fixture(autouse=True)
+def restore_routes(app):
+    routes = list(app.router.routes)
+    yield
+    app.router.routes[:] = routes
+
+@pytest.fixture
+def mock_init_db():
+    with patch("app.main.init_db") as mock:
+        yield mock
+
 
 # -------------------- Test configuration loader --------------------
 def test_load_configuration_ini(monkeypatch):
@@ -51,6 +75,17 @@ def test_load_configuration_env(monkeypatch):
         assert config["DB_PASSWORD"] == "env_pass"
         assert config["DB_NAME"] == "env_db"
 
+def test_load_configuration_pool_settings_from_env(monkeypatch):
+    with patch("app.main.load_config_ini", return_value=None):
+        monkeypatch.setenv("DB_USER", "env_user")
+        monkeypatch.setenv("DB_PASSWORD", "env_pass")
+        monkeypatch.setenv("DB_NAME", "env_db")
+        monkeypatch.setenv("DB_POOL_SIZE", "7")
+
+        config = load_configuration()
+        assert config["DB_POOL_SIZE"] == 7
+        assert config["DB_MAX_OVERFLOW"] == 30
+
 def test_load_configuration_missing_required(monkeypatch):
     from app.main import load_configuration
     # Patch load_config_ini to return None
@@ -66,40 +101,25 @@ def test_load_configuration_missing_required(monkeypatch):
 
 
 # -------------------- Test database initializer --------------------
-def test_initialize_database_calls_init_db(monkeypatch):
-    fake_config = {
-        "DB_USER": "user",
-        "DB_PASSWORD": "pass",
-        "DB_HOST": "localhost",
-        "DB_NAME": "dbname",
-        "DB_PORT": 3306,
-    }
+def test_initialize_database_calls_init_db(mock_init_db):
+    initialize_database(FAKE_CONFIG)
+    mock_init_db.assert_called_once_with(
+        "user", "pass", "localhost", "dbname", 3306
+    )
 
-    mock_init_db = MagicMock()
-    with patch("app.main.init_db", mock_init_db):
-        initialize_database(fake_config)
-        mock_init_db.assert_called_once_with(
-            "user", "pass", "localhost", "dbname", 3306
-        )
+def test_initialize_database_passes_pool_settings(mock_init_db):
+    fake_config = {**FAKE_CONFIG, "DB_POOL_SIZE": 7, "DB_POOL_RECYCLE": 60}
 
-def test_initialize_database_handles_exception():
-    from app.main import initialize_database
-    from unittest.mock import patch
+    initialize_database(fake_config)
+    mock_init_db.assert_called_once_with(
+        "user", "pass", "localhost", "dbname", 3306, pool_size=7, pool_recycle=60
+    )
 
-    fake_config = {
-        "DB_USER": "user",
-        "DB_PASSWORD": "pass",
-        "DB_HOST": "localhost",
-        "DB_NAME": "dbname",
-        "DB_PORT": 3306,
-    }
+def test_initialize_database_handles_exception(mock_init_db):
+    mock_init_db.side_effect = RuntimeError("DB fail")
 
-    def raise_error(*args, **kwargs):
-        raise RuntimeError("DB fail")
-
-    with patch("app.main.init_db", raise_error), \
-         patch("app.main.handle_db_exception") as mock_handle:
-        initialize_database(fake_config)
+    with patch("app.main.handle_db_exception") as mock_handle:
+        initialize_database(FAKE_CONFIG)
 
         mock_handle.assert_called_once()
         pos_args, kw_args = mock_handle.call_args
@@ -108,22 +128,62 @@ def test_initialize_database_handles_exception():
         assert kw_args["exit_on_error"] is False
 
 # -------------------- Test app with database initializer --------------------
-def test_create_app_with_db_initialization():
-    fake_config = {
-        "DB_USER": "user",
-        "DB_PASSWORD": "pass",
-        "DB_HOST": "localhost",
-        "DB_NAME": "dbname",
-        "DB_PORT": 3306,
-    }
-
-    mock_init_db = MagicMock()
-    with patch("app.main.init_db", mock_init_db):
-        app = create_app(config=fake_config)
+def test_create_app_with_db_initialization(mock_init_db):
+    app = create_app(config=FAKE_CONFIG)
+    # Database is only initialized once the app starts up
+    mock_init_db.assert_not_called()
+    with TestClient(app):
         mock_init_db.assert_called_once_with(
             "user", "pass", "localhost", "dbname", 3306
         )
 
+def test_lifespan_loads_configuration_and_disposes_engine(mock_init_db):
+    mock_engine = MagicMock()
+    with patch("app.main.load_configuration", return_value=FAKE_CONFIG) as mock_load, \
+         patch("app.database.engine", mock_engine):
+        app = create_app()
+        with TestClient(app):
+            mock_load.assert_called_once()
+            mock_init_db.assert_called_once()
+        mock_engine.dispose.assert_called_once()
+
+
+def test_logging_starts_with_the_lifespan():
+    import logging
+    from logging.handlers import QueueHandler
+    from app.logging_config import stop_logging
+
+    def queue_handlers():
+        return [h for h in logging.getLogger().handlers if isinstance(h, QueueHandler)]
+
+    stop_logging()
+    with patch("app.main.init_db"):
+        app = create_app(FAKE_CONFIG)
+        # No listener threads at import/create time, so pre-forked workers start their own
+        assert queue_handlers() == []
+        # Every startup/shutdown cycle attaches and removes them again
+        for _ in range(2):
+            with TestClient(app):
+                assert queue_handlers()
+            assert queue_handlers() == []
+
+
+def test_worker_thread_limit_matches_pool_capacity():
+    assert worker_thread_limit({}) == 50
+    assert worker_thread_limit({"DB_POOL_SIZE": 5, "DB_MAX_OVERFLOW": 10}) == 15
+
+
+def test_lifespan_sizes_threadpool(mock_init_db):
+    fake_config = {**FAKE_CONFIG, "DB_POOL_SIZE": 7, "DB_MAX_OVERFLOW": 3}
+    app = create_app(fake_config)
+
+    @app.get("/limit")
+    async def limit():
+        return {"tokens": anyio.to_thread.current_default_thread_limiter().total_tokens}
+
+    with TestClient(app) as client:
+        assert client.get("/limit").json() == {"tokens": 10}
+
 
 # -------------------- Test exception handlers --------------------
 def test_exception_handlers_registered(client):
@@ -147,6 +207,18 @@ def test_db_exception_handler(client):
     assert response.json()["detail"] == "Database error occurred. Please check logs."
 
 
+def test_swapi_fetch_error_handler(client):
+    from app.services.swapi_service import SwapiFetchError
+
+    @client.app.get("/raise-swapi-error")
+    async def raise_swapi_error():
+        raise SwapiFetchError("Failed to fetch people from SWAPI")
+
+    response = client.get("/raise-swapi-error")
+    assert response.status_code == 502
+    assert response.json()["detail"] == "Failed to fetch people from SWAPI"
+
+
 def test_http_exception_handler(client):
     @client.app.get("/raise-http-error")
     async def raise_http_error():
@@ -164,3 +236,21 @@ def test_general_exception_handler(client):
 	response = client.get("/raise-general-error")
 	assert response.status_code == 500
 	assert response.json()["detail"] == "Internal server error. Check logs."
+
+
+# -------------------- Test session middleware --------------------
+def test_db_session_removed_after_request(client):
+    from fastapi import Depends
+    from app import database
+    from app.database import get_db, init_db
+
+    init_db("", "", "", ":memory:", driver="sqlite")
+
+    @client.app.get("/session-scope")
+    def session_scope(db=Depends(get_db)):
+        return {"same": db is database.SessionLocal()}
+
+    response = client.get("/session-scope")
+    assert response.json() == {"same": True}
+    # The request's session has been removed from the registry
+    assert not database.SessionLocal.registry.registry
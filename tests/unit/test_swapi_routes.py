@@ -1,83 +1,144 @@
 # tests/test_swapi_routes.py
 
+import logging
 import pytest
-from unittest.mock import patch, MagicMock
+from datetime import date
+from unittest.mock import patch, MagicMock, DEFAULT
 from fastapi.testclient import TestClient
-from fastapi import FastAPI
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from app.database import Base, get_db
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database import get_db
 from app.models import Character, Film, Starship
 from app.routes import swapi_routes
 
-# ---------------------- Setup FastAPI app ----------------------
-app = FastAPI()
-app.include_router(swapi_routes.router)
-
-# Override get_db for testing with in-memory SQLite
-@pytest.fixture(scope="function")
-def db_session():
-    engine = create_engine(
-        "sqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,   # 🔑 ensures same in-memory DB is reused
-        future=True,
-    )
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    yield session
-    session.close()
-    Base.metadata.drop_all(engine)
+from app.main import create_app
 
+# ---------------------- Setup FastAPI app ----------------------
+# Full app so the global exception handlers apply; its lifespan (DB init) only
+# runs when TestClient is used as a context manager, which these tests don't do
+app = create_app()
 
-@pytest.fixture(scope="function")
-def client(db_session):
+def override_db(session):
+    """Make every request use `session` as its database session"""
     def override_get_db():
         try:
-            yield db_session
+            yield session
         finally:
-            db_session.close()
+            session.close()
     app.dependency_overrides[get_db] = override_get_db
-    return TestClient(app)
+
+# One empty in-memory SQLite database for the whole run; tables are created only once
+@pytest.fixture(scope="session")
+def engine(make_engine):
+    return make_engine()
+
+# A second database holding the sample data, seeded once for the whole run
+@pytest.fixture(scope="session")
+def seeded_engine(make_engine):
+    engine = make_engine()
+    with Session(engine) as session:
+        add_sample_data(session)
+    return engine
+
+@pytest.fixture(scope="function")
+def db_session(engine, savepoint_session):
+    with savepoint_session(engine) as session:
+        yield session
+
+# Per-test view of the sample data; writes made by the test are rolled back
+@pytest.fixture(scope="function")
+def seeded_db(seeded_engine, savepoint_session):
+    with savepoint_session(seeded_engine) as session:
+        override_db(session)
+        yield session
+
+
+# One client for the whole run; only the database it talks to changes per test
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app, raise_server_exceptions=False)
+
+# Requests use the empty per-test database unless the test asks for seeded_db
+@pytest.fixture(autouse=True)
+def bind_db(db_session):
+    override_db(db_session)
+    yield
+    app.dependency_overrides.pop(get_db, None)
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Every test starts from its own database, so never reuse cached results
+    swapi_routes.clear_response_cache()
+    yield
+    swapi_routes.clear_response_cache()
 
 # ---------------------- Helper function ----------------------
 def add_sample_data(db_session):
-    char1 = Character(name="Luke", gender="male", birth_year="19BBY")
-    char2 = Character(name="Leia", gender="female", birth_year="19BBY")
-    film1 = Film(title="A New Hope", director="George Lucas", release_date="1977-05-25")
-    film2 = Film(title="Empire Strikes Back", director="Irvin Kershner", release_date="1980-05-21")
-    ship1 = Starship(name="X-Wing", model="T-65", manufacturer="Incom")
-    ship2 = Starship(name="TIE Fighter", model="Twin Ion Engine", manufacturer="Sienar")
-    db_session.add_all([char1, char2, film1, film2, ship1, ship2])
+    # Plain executemany INSERTs, like store_objects; callers look rows up via sample_rows
+    db_session.execute(insert(Character), [
+        {"name": "Luke", "gender": "male", "birth_year": "19BBY"},
+        {"name": "Leia", "gender": "female", "birth_year": "19BBY"},
+    ])
+    db_session.execute(insert(Film), [
+        {"title": "A New Hope", "director": "George Lucas", "release_date": date(1977, 5, 25)},
+        {"title": "Empire Strikes Back", "director": "Irvin Kershner", "release_date": date(1980, 5, 21)},
+    ])
+    db_session.execute(insert(Starship), [
+        {"name": "X-Wing", "model": "T-65", "manufacturer": "Incom"},
+        {"name": "TIE Fighter", "model": "Twin Ion Engine", "manufacturer": "Sienar"},
+    ])
     db_session.commit()
-    return char1, char2, film1, film2, ship1, ship2
+
+def sample_rows(session):
+    """The seeded sample objects, in add_sample_data's order"""
+    chars = {c.name: c for c in session.query(Character)}
+    films = {f.title: f for f in session.query(Film)}
+    ships = {s.name: s for s in session.query(Starship)}
+    return (chars["Luke"], chars["Leia"], films["A New Hope"], films["Empire Strikes Back"],
+            ships["X-Wing"], ships["TIE Fighter"])
 
 # ---------------------- GET endpoints ----------------------
-def test_get_characters(client, db_session):
-    add_sample_data(db_session)
+def test_get_characters(client, seeded_db):
     response = client.get("/swapi/characters")
     assert response.status_code == 200
     assert len(response.json()) == 2
 
-def test_get_films(client, db_session):
-    add_sample_data(db_session)
+def test_get_films(client, seeded_db):
     response = client.get("/swapi/films")
     assert response.status_code == 200
     assert len(response.json()) == 2
+    assert {f["release_date"] for f in response.json()} == {"1977-05-25", "1980-05-21"}
 
-def test_get_starships(client, db_session):
-    add_sample_data(db_session)
+def test_get_starships(client, seeded_db):
     response = client.get("/swapi/starships")
     assert response.status_code == 200
     assert len(response.json()) == 2
 
-def test_skip_limit_validation(client, db_session):
-    add_sample_data(db_session)
-    
+def test_get_characters_loads_relationships_in_bulk(client, seeded_db):
+    from sqlalchemy import event
+    char1, char2, film1, film2, ship1, ship2 = sample_rows(seeded_db)
+    char1.films.extend([film1, film2])
+    char2.starships.append(ship1)
+    seeded_db.commit()
+
+    statements = []
+    engine = seeded_db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/swapi/characters")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    data = {c["name"]: c for c in response.json()}
+    assert [f["title"] for f in data["Luke"]["films"]] == ["A New Hope", "Empire Strikes Back"]
+    assert [s["name"] for s in data["Leia"]["starships"]] == ["X-Wing"]
+    # One query for characters plus one per relationship
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 3
+
+def test_skip_limit_validation(client, seeded_db):
     resp = client.get("/swapi/characters?skip=10001")
-    assert resp.status_code == 400
+    assert resp.status_code == 422
 
     resp = client.get("/swapi/characters?limit=0")
     assert resp.status_code == 422
@@ -85,79 +146,209 @@ def test_skip_limit_validation(client, db_session):
     resp = client.get("/swapi/characters?limit=101")
     assert resp.status_code == 422
 
+def test_get_results_are_cached_until_sync(client, seeded_db):
+    assert len(client.get("/swapi/characters").json()) == 2
+
+    seeded_db.add(Character(name="Han", gender="male", birth_year="29BBY"))
+    seeded_db.commit()
+    # Served from the cache
+    assert len(client.get("/swapi/characters").json()) == 2
+    # Different query parameters are cached separately
+    assert len(client.get("/swapi/characters?limit=5").json()) == 3
+
+    with patch("app.services.swapi_service.fetch_characters", return_value=[{"name": "Han"}]), \
+         patch("app.services.swapi_service.store_characters"):
+        client.post("/swapi/sync/characters")
+    assert len(client.get("/swapi/characters").json()) == 3
+
+def test_result_computed_across_a_cache_clear_is_not_stored():
+    calls = []
+
+    @swapi_routes.cached_route
+    def slow_read(skip=0):
+        calls.append(skip)
+        # A sync commits and clears the cache while this read is still running
+        swapi_routes.clear_response_cache()
+        return len(calls)
+
+    assert slow_read(skip=0) == 1
+    assert slow_read(skip=0) == 2
+    assert calls == [0, 0]
+
+def test_response_models_in_openapi_schema():
+    schemas = app.openapi()["components"]["schemas"]
+    assert {"CharacterOut", "FilmOut", "StarshipOut"} <= set(schemas)
+    assert set(schemas["CharacterOut"]["properties"]) == {
+        "id", "name", "gender", "birth_year", "films", "starships"
+    }
+
 # ---------------------- Search endpoints ----------------------
-def test_search_characters(client, db_session):
-    add_sample_data(db_session)
+def test_search_characters(client, seeded_db):
     resp = client.get("/swapi/characters/search?name=Luke")
     assert resp.status_code == 200
     data = resp.json()
     assert len(data) == 1
     assert data[0]["name"] == "Luke"
 
-def test_search_films(client, db_session):
-    add_sample_data(db_session)
+def test_search_films(client, seeded_db):
     resp = client.get("/swapi/films/search?title=Hope")
     assert resp.status_code == 200
     data = resp.json()
     assert len(data) == 1
     assert "Hope" in data[0]["title"]
 
-def test_search_starships(client, db_session):
-    add_sample_data(db_session)
+def test_search_starships(client, seeded_db):
     resp = client.get("/swapi/starships/search?name=X-Wing")
     assert resp.status_code == 200
     data = resp.json()
     assert len(data) == 1
     assert data[0]["name"] == "X-Wing"
 
-# ---------------------- Sync endpoints ----------------------
-@patch("app.services.swapi_service.fetch_characters")
-@patch("app.services.swapi_service.store_characters")
-def test_sync_characters(mock_store, mock_fetch, client, db_session):
-    mock_fetch.return_value = [{"name": "Luke"}]
-    response = client.post("/swapi/sync/characters")
-    assert response.status_code == 200
-    assert "characters synced successfully" in response.json()["message"]
+def test_search_sorts_exact_case_insensitive_match_first(client, seeded_db):
+    seeded_db.add_all([
+        Character(name="Anakin Lukewarm", gender="male", birth_year="41BBY"),
+        Character(name="Luke Skywalker", gender="male", birth_year="19BBY"),
+    ])
+    seeded_db.commit()
 
-@patch("app.services.swapi_service.fetch_films")
-@patch("app.services.swapi_service.store_films")
-def test_sync_films(mock_store, mock_fetch, client):
-    mock_fetch.return_value = [{"title": "A New Hope"}]
-    response = client.post("/swapi/sync/films")
-    assert response.status_code == 200
-    assert "films synced successfully" in response.json()["message"]
+    found = client.get("/swapi/characters/search?name=luke").json()
+    assert [c["name"] for c in found] == ["Luke", "Anakin Lukewarm", "Luke Skywalker"]
+
+    partial = client.get("/swapi/characters/search?name=Sky").json()
+    assert [c["name"] for c in partial] == ["Luke Skywalker"]
+
+def test_search_pages_through_one_result_set(client, seeded_db):
+    seeded_db.add_all([
+        Character(name="Anakin Lukewarm", gender="male", birth_year="41BBY"),
+        Character(name="Luke Skywalker", gender="male", birth_year="19BBY"),
+    ])
+    seeded_db.commit()
+
+    pages = [client.get(f"/swapi/characters/search?name=Luke&skip={skip}&limit=1").json()
+             for skip in range(4)]
+    assert [c["name"] for page in pages for c in page] == ["Luke", "Anakin Lukewarm", "Luke Skywalker"]
+
+def test_search_probes_exact_match_with_its_own_equality_query(client, seeded_db):
+    from sqlalchemy import event
+    statements = []
+    engine = seeded_db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.get("/swapi/characters/search?name=Luke")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # The equality WHERE is what lets the lower(name) index answer exact matches
+    wheres = [sql.split("WHERE", 1)[1] for sql in statements if "FROM character" in sql and "WHERE" in sql]
+    assert wheres[0].strip().startswith("lower(character.name) = ")
+
+def test_search_treats_like_wildcards_literally(client, seeded_db):
+    assert client.get("/swapi/characters/search?name=%25").json() == []
+    assert client.get("/swapi/starships/search?name=X_Wing").json() == []
+
+def test_starts_with_endpoints(client, seeded_db):
+    seeded_db.add(Character(name="Luke Skywalker", gender="male", birth_year="19BBY"))
+    seeded_db.commit()
+
+    chars = client.get("/swapi/characters/starts?prefix=Luke").json()
+    assert [c["name"] for c in chars] == ["Luke", "Luke Skywalker"]
+    assert client.get("/swapi/characters/starts?prefix=Sky").json() == []
+    assert [f["title"] for f in client.get("/swapi/films/starts?prefix=A").json()] == ["A New Hope"]
+    assert [s["name"] for s in client.get("/swapi/starships/starts?prefix=X-").json()] == ["X-Wing"]
+
+def test_starts_with_pages_in_column_order(client, seeded_db):
+    seeded_db.add_all([
+        Character(name="Luke Skywalker", gender="male", birth_year="19BBY"),
+        Character(name="Lando", gender="male", birth_year="31BBY"),
+    ])
+    seeded_db.commit()
 
-@patch("app.services.swapi_service.fetch_starships")
-@patch("app.services.swapi_service.store_starships")
-def test_sync_starships(mock_store, mock_fetch, client):
-    mock_fetch.return_value = [{"name": "X-Wing"}]
-    response = client.post("/swapi/sync/starships")
+    pages = [client.get(f"/swapi/characters/starts?prefix=L&skip={skip}&limit=1").json()
+             for skip in range(5)]
+    assert [c["name"] for page in pages for c in page] == ["Lando", "Leia", "Luke", "Luke Skywalker"]
+
+def test_starts_with_treats_like_wildcards_literally(client, seeded_db):
+    assert client.get("/swapi/characters/starts?prefix=%25").json() == []
+    assert client.get("/swapi/starships/starts?prefix=X_").json() == []
+
+def test_log_fetched_respects_log_level(caplog):
+    rows = [{"name": "Luke"}, {"name": "Leia"}]
+    with caplog.at_level(logging.INFO, logger=swapi_routes.logger.name):
+        swapi_routes.log_fetched(rows, "name")
+    assert "Fetched: Luke | Leia" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger=swapi_routes.logger.name):
+        swapi_routes.log_fetched(rows, "name")
+    assert caplog.text == ""
+
+def test_bulk_children_groups_rows_across_batches(seeded_db, monkeypatch):
+    from app.models import character_film
+    char1, char2, film1, film2, ship1, ship2 = sample_rows(seeded_db)
+    char1.films.extend([film1, film2])
+    char2.films.append(film2)
+    seeded_db.commit()
+
+    monkeypatch.setattr(swapi_routes, "CHILD_ROWS_BATCH", 1)
+    children = swapi_routes.bulk_children(
+        seeded_db, character_film, "character_id", Film, [char1.id, char2.id], ("id", "title")
+    )
+    assert [f["title"] for f in children[char1.id]] == ["A New Hope", "Empire Strikes Back"]
+    assert [f["title"] for f in children[char2.id]] == ["Empire Strikes Back"]
+
+def test_escape_like():
+    assert swapi_routes.escape_like("50%_off\\") == "50\\%\\_off\\\\"
+
+# ---------------------- Sync endpoints ----------------------
+@pytest.mark.parametrize("resource, fetch_name, store_name, payload", [
+    ("characters", "fetch_characters", "store_characters", {"name": "Luke"}),
+    ("films", "fetch_films", "store_films", {"title": "A New Hope"}),
+    ("starships", "fetch_starships", "store_starships", {"name": "X-Wing"}),
+])
+def test_sync_endpoint(resource, fetch_name, store_name, payload, client, db_session):
+    with patch.multiple("app.services.swapi_service", **{fetch_name: DEFAULT, store_name: DEFAULT}) as mocks:
+        mocks[fetch_name].return_value = [payload]
+        response = client.post(f"/swapi/sync/{resource}")
     assert response.status_code == 200
-    assert "starships synced successfully" in response.json()["message"]
+    assert f"{resource} synced successfully" in response.json()["message"]
+    mocks[store_name].assert_called_once_with(db_session, [payload])
+
+def test_sync_characters_commits(client, db_session):
+    with patch("app.services.swapi_service.fetch_characters",
+               return_value=[{"name": "Luke", "gender": "male", "birth_year": "19BBY"}]):
+        assert client.post("/swapi/sync/characters").status_code == 200
+    # The request's session was closed; the row must have been committed to survive
+    assert [c.name for c in db_session.query(Character)] == ["Luke"]
 
 # ---------------------- sync_all orchestration ----------------------
-@patch("app.services.swapi_service.fetch_characters")
-@patch("app.services.swapi_service.store_characters")
-@patch("app.services.swapi_service.fetch_films")
-@patch("app.services.swapi_service.store_films")
-@patch("app.services.swapi_service.fetch_starships")
-@patch("app.services.swapi_service.store_starships")
-@patch("app.services.swapi_service.fill_relationships")
-def test_sync_all_endpoint(mock_fill, mock_store_ship, mock_fetch_ship,
-                           mock_store_film, mock_fetch_film,
-                           mock_store_char, mock_fetch_char, client):
-    mock_fetch_char.return_value = [{"name": "Luke"}]
-    mock_fetch_film.return_value = [{"title": "A New Hope"}]
-    mock_fetch_ship.return_value = [{"name": "X-Wing"}]
-
-    response = client.post("/swapi/sync/all")
+def test_sync_all_endpoint(client):
+    with patch.multiple(
+        "app.services.swapi_service",
+        fetch_all=DEFAULT,
+        store_characters=DEFAULT,
+        store_films=DEFAULT,
+        store_starships=DEFAULT,
+        fill_relationships=DEFAULT,
+    ) as mocks:
+        mocks["fetch_all"].return_value = ([{"name": "Luke"}], [{"title": "A New Hope"}], [{"name": "X-Wing"}])
+        response = client.post("/swapi/sync/all")
     assert response.status_code == 200
     assert "All SWAPI data synced successfully" in response.json()["message"]
+    mocks["fill_relationships"].assert_called_once()
 
-# ---------------------- safe_route exception handling ----------------------
-def test_safe_route_exception(client, db_session):
+# ---------------------- Exception handling ----------------------
+def test_route_exception_handled_globally(client, db_session):
     # Patch a route function to raise exception
     with patch("app.services.swapi_service.fetch_characters", side_effect=Exception("fail")):
         resp = client.post("/swapi/sync/characters")
         assert resp.status_code == 500
-        assert "Internal error" in resp.json()["detail"]
+        assert resp.json()["detail"] == "Internal server error. Check logs."
+
+def test_route_db_exception_handled_globally(client, db_session):
+    from sqlalchemy.exc import OperationalError
+    with patch("app.services.swapi_service.fetch_characters", return_value=[{"name": "Luke"}]), \
+         patch("app.services.swapi_service.store_characters", side_effect=OperationalError("stmt", {}, "orig")):
+        resp = client.post("/swapi/sync/characters")
+        assert resp.status_code == 500
+        assert resp.json()["detail"] == "Database error occurred. Please check logs."
@@ -1,69 +1,202 @@
 # tests/test_swapi_service.py
 
+import asyncio
+import httpx
 import pytest
-from unittest.mock import patch, Mock, MagicMock
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import sqlalchemy.dialects
+from datetime import date
+from unittest.mock import patch, Mock, MagicMock, DEFAULT
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from app.database import Base
-from app.models import Character, Film, Starship
+from app.models import Character, Film, Starship, character_film, character_starship, film_starship
 import app.services.swapi_service as swapi
 from app.services import swapi_sync
 import requests
 
 # ---------------------- Fixtures ----------------------
 
+# One in-memory SQLite database for the whole module; the schema is created once
+@pytest.fixture(scope="module")
+def engine(make_engine):
+    return make_engine()
+
 @pytest.fixture(scope="function")
-def db_session():
-    """Create an in-memory SQLite database and session for testing."""
-    engine = create_engine("sqlite:///:memory:", echo=False, future=True)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    yield session
-    session.close()
+def db_session(engine, savepoint_session):
+    """Session inside a transaction that is rolled back after the test; commits only release SAVEPOINTs."""
+    # Keep attributes loaded across commits so assertions don't re-SELECT every row
+    with savepoint_session(engine, expire_on_commit=False) as session:
+        yield session
+
+def assert_row(db, model, **filters):
+    """Assert exactly one `model` row matches `filters` and return it"""
+    return db.scalars(select(model).filter_by(**filters)).one()
 
 @pytest.fixture
 def mock_db():
     return MagicMock()
 
+@pytest.fixture(autouse=True)
+def swapi_cache_dir(tmp_path, monkeypatch):
+    """Keep the SWAPI response cache inside the test's temporary directory."""
+    monkeypatch.setattr(swapi, "SWAPI_CACHE_DIR", str(tmp_path / "swapi_cache"))
+    swapi._fetch_memoized.cache_clear()
+    yield tmp_path / "swapi_cache"
+    swapi._fetch_memoized.cache_clear()
+
 # ---------------------- fetch_from_swapi ----------------------
 
-@patch("app.services.swapi_service.requests.get")
+@patch("app.services.swapi_service._SESSION.get")
 def test_fetch_from_swapi_success(mock_get):
 	# Successful fetch
 	mock_resp = Mock()
 	mock_resp.json.return_value = {"results": [{"name": "Luke"}]}
 	mock_resp.raise_for_status.return_value = None
+	mock_resp.status_code = 200
+	mock_resp.headers = {}
 	mock_get.return_value = mock_resp
 
 	result = swapi.fetch_from_swapi("people")
 	assert isinstance(result, list)
 	assert result[0][0]["name"] == "Luke"
 
-@patch("app.services.swapi_service.requests.get")
+@patch("app.services.swapi_service._SESSION.get")
 def test_fetch_from_swapi_retries(mock_get):
     # First 2 attempts fail with RequestException, third returns empty results
     mock_get.side_effect = [
         requests.exceptions.RequestException("Failed"),
         requests.exceptions.RequestException("Failed"),
-        Mock(json=Mock(return_value={"results": []}), raise_for_status=Mock())
+        Mock(json=Mock(return_value={"results": []}), raise_for_status=Mock(), status_code=200, headers={})
     ]
 
     result = swapi.fetch_from_swapi("people", retries=3, delay=0, fail_fast=False)
     assert result[0] == []
 
 
-@patch("app.services.swapi_service.requests.get")
+def test_fetch_from_swapi_uses_prebuilt_urls():
+    response = Mock(json=Mock(return_value=[]), raise_for_status=Mock(), status_code=200, headers={})
+    with patch.object(swapi._SESSION, "get", return_value=response) as mock_get:
+        swapi.fetch_from_swapi("starships")
+        swapi.fetch_from_swapi("vehicles")
+    assert [c.args[0] for c in mock_get.call_args_list] == [
+        "https://swapi.info/api/starships", "https://swapi.info/api/vehicles"
+    ]
+
+@patch("app.services.swapi_service._SESSION.get")
 def test_fetch_from_swapi_failure_raises(mock_get):
-    from fastapi import HTTPException
     mock_get.side_effect = requests.exceptions.RequestException("Failed")
 
-    with pytest.raises(HTTPException) as exc_info:
+    with pytest.raises(swapi.SwapiFetchError, match="Failed to fetch people from SWAPI"):
         swapi.fetch_from_swapi("people", retries=2, delay=0, fail_fast=True)
-
-    assert exc_info.value.status_code == 502
 	
+def swapi_transport(responses):
+    """httpx transport answering each endpoint path with the next queued response."""
+    def handler(request):
+        return responses[request.url.path.rsplit("/", 1)[-1]].pop(0)
+    return httpx.MockTransport(handler)
+
+def test_fetch_from_swapi_async_retries_then_succeeds():
+    transport = swapi_transport({"people": [
+        httpx.Response(500),
+        httpx.Response(200, json={"1": {"name": "Luke"}}),
+    ]})
+
+    async def run():
+        async with httpx.AsyncClient(base_url=swapi.SWAPI_BASE, transport=transport) as client:
+            return await swapi.fetch_from_swapi_async(client, "people", retries=2, delay=0)
+
+    assert asyncio.run(run()) == [{"name": "Luke"}]
+
+def test_fetch_from_swapi_async_failure_raises():
+    transport = swapi_transport({"films": [httpx.Response(503), httpx.Response(503)]})
+
+    async def run():
+        async with httpx.AsyncClient(base_url=swapi.SWAPI_BASE, transport=transport) as client:
+            return await swapi.fetch_from_swapi_async(client, "films", retries=2, delay=0)
+
+    with pytest.raises(swapi.SwapiFetchError, match="films"):
+        asyncio.run(run())
+
+def test_fetch_all_gathers_every_endpoint():
+    async def fake_fetch(client, endpoint):
+        await asyncio.sleep(0)
+        return [endpoint]
+
+    with patch("app.services.swapi_service.fetch_from_swapi_async", side_effect=fake_fetch) as mock_fetch:
+        assert swapi.fetch_all() == (["people"], ["films"], ["starships"])
+    assert [c.args[1] for c in mock_fetch.call_args_list] == ["people", "films", "starships"]
+
+def test_fetch_from_swapi_reuses_session():
+    response = Mock(json=Mock(return_value=[]), raise_for_status=Mock(), status_code=200, headers={})
+    with patch.object(swapi._SESSION, "get", return_value=response) as mock_get, \
+         patch("app.services.swapi_service.requests.get") as module_get:
+        swapi.fetch_from_swapi("people")
+        swapi.fetch_from_swapi("films")
+    assert mock_get.call_count == 2
+    module_get.assert_not_called()
+    assert swapi._SESSION.headers["Accept"] == "application/json"
+
+def test_fetch_from_swapi_revalidates_cache_with_etag():
+    fresh = Mock(json=Mock(return_value={"1": {"name": "Luke"}}), raise_for_status=Mock(),
+                 status_code=200, headers={"ETag": '"v1"'})
+    not_modified = Mock(status_code=304, headers={})
+    with patch.object(swapi._SESSION, "get", side_effect=[fresh, not_modified]) as mock_get:
+        assert swapi.fetch_from_swapi("people") == [{"name": "Luke"}]
+        assert swapi.fetch_from_swapi("people") == [{"name": "Luke"}]
+    assert mock_get.call_args_list[0].kwargs["headers"] == {}
+    assert mock_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
+    not_modified.raise_for_status.assert_not_called()
+
+def test_fetch_from_swapi_async_uses_cache_on_304():
+    swapi.save_cached("films", '"v2"', [{"title": "A New Hope"}])
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        return httpx.Response(304)
+
+    async def run():
+        async with httpx.AsyncClient(base_url=swapi.SWAPI_BASE, transport=httpx.MockTransport(handler)) as client:
+            return await swapi.fetch_from_swapi_async(client, "films", retries=1, delay=0)
+
+    assert asyncio.run(run()) == [{"title": "A New Hope"}]
+    assert seen == ['"v2"']
+
+def test_save_cached_skips_responses_without_etag(swapi_cache_dir):
+    swapi.save_cached("people", None, [{"name": "Luke"}])
+    assert swapi.load_cached("people") is None
+    assert not swapi_cache_dir.exists()
+
+def test_save_cached_writes_through_unique_temp_files(swapi_cache_dir):
+    swapi.save_cached("people", '"v1"', [{"name": "Luke"}])
+    swapi.save_cached("people", '"v2"', [{"name": "Leia"}])
+    assert swapi.load_cached("people") == {"etag": '"v2"', "data": [{"name": "Leia"}]}
+    assert [p.name for p in swapi_cache_dir.iterdir()] == ["people.json"]
+
+@pytest.mark.parametrize("content", ['{"data": []}', '[]', '{"etag": null, "data": []}', '{"etag": "x"}'])
+def test_load_cached_treats_malformed_entries_as_miss(swapi_cache_dir, content):
+    swapi_cache_dir.mkdir()
+    (swapi_cache_dir / "people.json").write_text(content, encoding="utf-8")
+    assert swapi.load_cached("people") is None
+    assert swapi.conditional_headers(swapi.load_cached("people")) == {}
+
+def test_fetch_from_swapi_memoizes_when_not_fail_fast():
+    response = Mock(json=Mock(return_value=[{"name": "Luke"}]), raise_for_status=Mock(),
+                    status_code=200, headers={})
+    with patch.object(swapi._SESSION, "get", return_value=response) as mock_get:
+        first = swapi.fetch_from_swapi("people", fail_fast=False)
+        first.append({"name": "mutated"})
+        assert swapi.fetch_from_swapi("people", fail_fast=False) == [{"name": "Luke"}]
+        swapi.fetch_from_swapi("people")  # routes always fetch
+    assert mock_get.call_count == 2
+
+def test_fetch_from_swapi_does_not_memoize_failures():
+    ok = Mock(json=Mock(return_value=[{"name": "Luke"}]), raise_for_status=Mock(),
+              status_code=200, headers={})
+    with patch.object(swapi._SESSION, "get",
+                      side_effect=[requests.exceptions.RequestException("down"), ok]):
+        assert swapi.fetch_from_swapi("people", retries=1, delay=0, fail_fast=False) == []
+        assert swapi.fetch_from_swapi("people", retries=1, delay=0, fail_fast=False) == [{"name": "Luke"}]
+
 # ---------------------- store_objects ----------------------
 
 def test_store_objects_adds_to_db(db_session):
@@ -81,22 +214,89 @@ def test_store_objects_skips_duplicates(db_session):
     chars = db_session.query(Character).all()
     assert len(chars) == 1  # duplicate skipped
 
+def test_store_objects_skips_duplicates_within_batch(db_session):
+    data_list = [
+        {"name": "Luke", "gender": "male", "birth_year": "19BBY"},
+        {"name": "Luke", "gender": "other", "birth_year": "?"},
+        {"name": "Leia", "gender": "female", "birth_year": "19BBY", "url": "ignored"},
+    ]
+    swapi.store_objects(db_session, Character, data_list, "name")
+    assert sorted(c.name for c in db_session.query(Character)) == ["Leia", "Luke"]
+    assert assert_row(db_session, Character, name="Luke").gender == "male"
+
+def test_chunked():
+    assert list(swapi.chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+    assert list(swapi.chunked([], 2)) == []
+
+def test_store_objects_executes_in_pages(db_session):
+    data_list = [{"name": f"Clone {i}", "gender": "male", "birth_year": "?"} for i in range(5)]
+    with patch("app.services.swapi_service.INSERT_PAGE_SIZE", 2), \
+         patch.object(db_session, "execute", wraps=db_session.execute) as mock_execute:
+        swapi.store_objects(db_session, Character, data_list, "name")
+    assert [len(c.args[1]) for c in mock_execute.call_args_list] == [2, 2, 1]
+    assert db_session.query(Character).count() == 5
+
+def test_model_columns():
+    assert swapi.model_columns(Character) == {"id", "name", "gender", "birth_year"}
+    assert swapi.model_columns(Character) is swapi.model_columns(Character)
+
+def test_store_objects_consumes_generators(db_session):
+    rows = ({"name": f"Clone {i}", "gender": "male", "birth_year": "?"} for i in range(3))
+    swapi.store_objects(db_session, Character, rows, "name")
+    assert db_session.query(Character).count() == 3
+    swapi.store_objects(db_session, Character, iter([]), "name")
+
+def test_store_objects_empty_list_is_noop(mock_db):
+    swapi.store_objects(mock_db, Character, [], "name")
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
+
+@pytest.mark.parametrize("dialect_name, clause", [
+    ("mysql", "ON DUPLICATE KEY UPDATE"),
+    ("postgresql", "ON CONFLICT (name) DO NOTHING"),
+    ("sqlite", "ON CONFLICT (name) DO NOTHING"),
+])
+def test_upsert_statement_per_dialect(dialect_name, clause):
+    stmt = swapi.upsert_statement(dialect_name, Character, "name")
+    dialect = getattr(sqlalchemy.dialects, dialect_name).dialect()
+    assert clause in str(stmt.compile(dialect=dialect))
+
+def test_upsert_statement_is_built_once_per_model():
+    assert swapi.upsert_statement("sqlite", Film, "title") is swapi.upsert_statement("sqlite", Film, "title")
+    assert swapi.upsert_statement("sqlite", Film, "title") is not swapi.upsert_statement("mysql", Film, "title")
+
+def test_store_objects_falls_back_without_upsert(db_session):
+    data_list = [{"name": "Luke", "gender": "male", "birth_year": "19BBY"}]
+    with patch("app.services.swapi_service.upsert_statement", return_value=None):
+        swapi.store_objects(db_session, Character, data_list, "name")
+        swapi.store_objects(db_session, Character, data_list + [dict(data_list[0], name="Leia")] * 2, "name")
+    assert sorted(c.name for c in db_session.query(Character)) == ["Leia", "Luke"]
+
 # ---------------------- store_characters / films / starships ----------------------
 
 def test_store_characters(db_session):
     mock_data = [{"name": "Leia", "gender": "female", "birth_year": "19BBY"}]
     swapi.store_characters(db_session, mock_data)
-    assert db_session.query(Character).filter_by(name="Leia").first() is not None
+    assert_row(db_session, Character, name="Leia")
 
 def test_store_films(db_session):
     mock_data = [{"title": "A New Hope", "director": "George Lucas", "release_date": "1977-05-25"}]
     swapi.store_films(db_session, mock_data)
-    assert db_session.query(Film).filter_by(title="A New Hope").first() is not None
+    film = assert_row(db_session, Film, title="A New Hope")
+    assert film.release_date == date(1977, 5, 25)
+
+@pytest.mark.parametrize("value, expected", [
+    ("1977-05-25", date(1977, 5, 25)),
+    ("unknown", None),
+    (None, None),
+])
+def test_parse_date(value, expected):
+    assert swapi.parse_date(value) == expected
 
 def test_store_starships(db_session):
     mock_data = [{"name": "X-Wing", "model": "T-65", "manufacturer": "Incom"}]
     swapi.store_starships(db_session, mock_data)
-    assert db_session.query(Starship).filter_by(name="X-Wing").first() is not None
+    assert_row(db_session, Starship, name="X-Wing")
 
 # ---------------------- fill_relationships ----------------------
 
@@ -114,32 +314,96 @@ def test_fill_relationships(db_session):
     assert ship in char.starships
     assert ship in film.starships
 
+def test_fill_relationships_is_idempotent(db_session):
+    db_session.add_all([
+        Character(name="Luke"), Character(name="Leia"),
+        Film(title="A New Hope"), Starship(name="X-Wing"), Starship(name="TIE"),
+    ])
+    db_session.commit()
+
+    swapi.fill_relationships(db_session)
+    swapi.fill_relationships(db_session)
+
+    assert db_session.query(character_film).count() == 2
+    assert db_session.query(character_starship).count() == 4
+    assert db_session.query(film_starship).count() == 2
+
+def test_fill_relationships_uses_insert_ignore_on_mysql(mock_db):
+    mock_db.get_bind.return_value.dialect = sqlalchemy.dialects.mysql.dialect()
+    swapi.fill_relationships(mock_db)
+    statements = [str(c.args[0].compile(dialect=sqlalchemy.dialects.mysql.dialect()))
+                  for c in mock_db.execute.call_args_list]
+    assert len(statements) == 3
+    assert all(sql.startswith("INSERT IGNORE INTO") and "EXISTS" not in sql for sql in statements)
+    mock_db.flush.assert_called_once()
+    mock_db.commit.assert_not_called()
+
 # ---------------------- sync_all ----------------------
 
-def test_sync_all_calls_all_functions(mock_db):
-    with patch("app.services.swapi_service.fetch_characters") as mock_fetch_characters, \
-         patch("app.services.swapi_service.store_characters") as mock_store_characters, \
-         patch("app.services.swapi_service.fetch_films") as mock_fetch_films, \
-         patch("app.services.swapi_service.store_films") as mock_store_films, \
-         patch("app.services.swapi_service.fetch_starships") as mock_fetch_starships, \
-         patch("app.services.swapi_service.store_starships") as mock_store_starships, \
-         patch("app.services.swapi_service.fill_relationships") as mock_fill_relationships:
+SYNC_DATA = ([{"name": "Luke"}], [{"title": "A New Hope"}], [{"name": "X-Wing"}])
 
-        mock_fetch_characters.return_value = [{"name": "Luke"}]
-        mock_fetch_films.return_value = [{"title": "A New Hope"}]
-        mock_fetch_starships.return_value = [{"name": "X-Wing"}]
+@pytest.fixture
+def sync_mocks():
+    """Patch every service function sync_all calls; yields the mocks by name."""
+    with patch.multiple(
+        "app.services.swapi_service",
+        fetch_all=DEFAULT,
+        store_characters=DEFAULT,
+        store_films=DEFAULT,
+        store_starships=DEFAULT,
+        fill_relationships=DEFAULT,
+    ) as mocks:
+        mocks["fetch_all"].return_value = SYNC_DATA
+        yield mocks
 
-        swapi_sync.sync_all(mock_db)
+def test_sync_all_calls_all_functions(mock_db, sync_mocks):
+    mock_db.get_bind.return_value.dialect.name = "sqlite"
+
+    swapi_sync.sync_all(mock_db)
 
-        # Assert fetches
-        mock_fetch_characters.assert_called_once()
-        mock_fetch_films.assert_called_once()
-        mock_fetch_starships.assert_called_once()
+    # Assert fetches
+    sync_mocks["fetch_all"].assert_called_once()
+
+    # Assert stores
+    sync_mocks["store_characters"].assert_called_once_with(mock_db, [{"name": "Luke"}])
+    sync_mocks["store_films"].assert_called_once_with(mock_db, [{"title": "A New Hope"}])
+    sync_mocks["store_starships"].assert_called_once_with(mock_db, [{"name": "X-Wing"}])
+
+    # Assert relationships filled
+    sync_mocks["fill_relationships"].assert_called_once_with(mock_db)
+
+    # One commit for the whole sync
+    mock_db.commit.assert_called_once()
+    mock_db.rollback.assert_not_called()
+
+def test_sync_all_stores_concurrently_on_pooled_databases(mock_db, sync_mocks):
+    mock_db.get_bind.return_value.dialect.name = "mysql"
+    sessions = []
+
+    def fake_session(bind):
+        # Runs on several executor threads at once; never reach through sessions[-1]
+        session = MagicMock(bind=bind)
+        session.__enter__.return_value = session
+        sessions.append(session)
+        return session
+
+    with patch("app.services.swapi_sync.Session", side_effect=fake_session):
+        swapi_sync.sync_all(mock_db)
 
-        # Assert stores
-        mock_store_characters.assert_called_once_with(mock_db, [{"name": "Luke"}])
-        mock_store_films.assert_called_once_with(mock_db, [{"title": "A New Hope"}])
-        mock_store_starships.assert_called_once_with(mock_db, [{"name": "X-Wing"}])
+    assert len(sessions) == 3
+    assert all(s.bind is mock_db.get_bind.return_value for s in sessions)
+    assert all(s.commit.call_count == 1 for s in sessions)
+    stored_with = {sync_mocks[name].call_args.args[0]
+                   for name in ("store_characters", "store_films", "store_starships")}
+    assert stored_with == set(sessions)
+    sync_mocks["fill_relationships"].assert_called_once_with(mock_db)
+    mock_db.commit.assert_called_once()
 
-        # Assert relationships filled
-        mock_fill_relationships.assert_called_once_with(mock_db)
+def test_sync_all_rolls_back_everything_on_failure(db_session):
+    with patch("app.services.swapi_service.fetch_all",
+               return_value=([{"name": "Luke"}], [{"title": "A New Hope"}], [])), \
+         patch("app.services.swapi_service.fill_relationships", side_effect=RuntimeError("boom")):
+        with pytest.raises(RuntimeError):
+            swapi_sync.sync_all(db_session)
+    assert db_session.query(Character).count() == 0
+    assert db_session.query(Film).count() == 0